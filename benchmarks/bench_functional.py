@@ -0,0 +1,38 @@
+"""
+Benchmarks for lazy() proxies and SimpleLazyObject.
+"""
+import six
+
+from pydsettings.utils.functional import SimpleLazyObject, lazy
+
+
+def _upper(value):
+    return value.upper()
+
+lazy_upper = lazy(_upper, six.text_type)
+
+
+class Lazy(object):
+    def setup(self):
+        self.proxy = lazy_upper('value')
+
+    def time_create(self):
+        lazy_upper('value')
+
+    def time_evaluate(self):
+        six.text_type(self.proxy)
+
+    def time_method_call(self):
+        self.proxy.startswith('V')
+
+
+class SimpleLazy(object):
+    def setup(self):
+        self.obj = SimpleLazyObject(dict)
+        self.obj['key'] = 'value'
+
+    def time_first_access(self):
+        SimpleLazyObject(dict)['key'] = 'value'
+
+    def time_steady_state(self):
+        self.obj['key']
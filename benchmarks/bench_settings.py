@@ -0,0 +1,104 @@
+"""
+Benchmarks for settings reads, override_settings and setting_changed.
+"""
+import os
+
+from pydsettings.conf import (ENVIRONMENT_VARIABLE, LazySettings, derived,
+    settings)
+from pydsettings.decorators import override_settings
+from pydsettings.signals import setting_changed
+
+if not settings.configured:
+    settings.configure(DEBUG=False)
+
+
+class SettingsReads(object):
+    params = ['configured', 'module']
+    param_names = ['backend']
+
+    def setup(self, backend):
+        self.settings = LazySettings()
+        if backend == 'configured':
+            self.settings.configure(
+                DEBUG=False, CACHE_BACKEND='locmem', CACHE_TIMEOUT=300,
+                CACHE_LOCATION=derived(
+                    lambda s: '%s:%s' % (s.CACHE_BACKEND, s.CACHE_TIMEOUT)))
+        else:
+            old = os.environ.get(ENVIRONMENT_VARIABLE)
+            os.environ[ENVIRONMENT_VARIABLE] = 'benchmarks.settings_module'
+            try:
+                self.settings.DEBUG
+            finally:
+                if old is None:
+                    del os.environ[ENVIRONMENT_VARIABLE]
+                else:
+                    os.environ[ENVIRONMENT_VARIABLE] = old
+
+    def time_read(self, backend):
+        self.settings.CACHE_TIMEOUT
+
+    def time_read_derived(self, backend):
+        self.settings.CACHE_LOCATION
+
+    def time_read_missing(self, backend):
+        getattr(self.settings, 'MISSING', None)
+
+
+class OverrideSettings(object):
+    params = [1, 4, 16]
+    param_names = ['depth']
+
+    def setup(self, depth):
+        self.overrides = [override_settings(**{'SETTING_%d' % i: i})
+                          for i in range(depth)]
+
+    def time_enter_exit(self, depth):
+        for override in self.overrides:
+            override.enable()
+        for override in reversed(self.overrides):
+            override.disable()
+
+    def time_read_through(self, depth):
+        for override in self.overrides:
+            override.enable()
+        try:
+            settings.DEBUG
+        finally:
+            for override in reversed(self.overrides):
+                override.disable()
+
+
+class SettingChanged(object):
+    params = [0, 1, 10, 100]
+    param_names = ['receivers']
+
+    def setup(self, receivers):
+        self.receivers = [lambda sender, **kwargs: None
+                          for i in range(receivers)]
+        for receiver in self.receivers:
+            setting_changed.connect(receiver)
+
+    def teardown(self, receivers):
+        for receiver in self.receivers:
+            setting_changed.disconnect(receiver)
+
+    def time_send(self, receivers):
+        setting_changed.send(sender=LazySettings, setting='DEBUG',
+                             value=True, enter=True)
+
+
+class BulkAccess(object):
+    params = [100, 1000]
+    param_names = ['settings']
+
+    def setup(self, count):
+        options = dict(('SETTING_%d' % i, i) for i in range(count))
+        options.update(CACHE_BACKEND='locmem', CACHE_TIMEOUT=300)
+        self.settings = LazySettings()
+        self.settings.configure(**options)
+
+    def time_namespace(self, count):
+        self.settings.namespace('CACHE_')
+
+    def time_as_dict(self, count):
+        self.settings.as_dict()
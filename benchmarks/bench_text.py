@@ -0,0 +1,167 @@
+"""
+Benchmarks for the encoding, text and safestring utilities. Every batch
+function has a ``time_*_many`` case next to a ``time_*_loop`` case calling
+the scalar function over the same batch.
+"""
+from pydsettings.utils.encoding import (force_bytes, force_bytes_many,
+    force_text, force_text_many, iri_to_uri, iri_to_uri_many)
+from pydsettings.utils.safestring import mark_safe, mark_safe_many
+from pydsettings.utils.text import (Truncator, compress_sequence,
+    javascript_quote, javascript_quote_many, slugify, slugify_many,
+    truncate_many, unescape_entities, unescape_entities_many, wrap,
+    wrap_many)
+
+ASCII = 'The quick brown fox jumps over the lazy dog. ' * 20
+UNICODE = u'Sch\xf6ne Gr\xfc\xdfe aus K\xf6ln, \u2603 und \u20ac. ' * 20
+HTML = '<p>%s</p>' % ('<b>The</b> quick <i>brown</i> fox. ' * 20)
+
+
+def batch(text, length=40, distinct=100, size=1000):
+    """
+    Returns ``size`` slices of ``text``, ``distinct`` of them different.
+    """
+    return [text[i:i + length] for i in range(distinct)] * (size // distinct)
+
+
+class Encoding(object):
+    params = ['ascii', 'unicode']
+    param_names = ['text']
+
+    def setup(self, text):
+        self.text = ASCII if text == 'ascii' else UNICODE
+        self.bytes = self.text.encode('utf-8')
+        self.texts = batch(self.text)
+        self.bytes_batch = [value.encode('utf-8') for value in self.texts]
+
+    def time_force_text(self, text):
+        force_text(self.bytes)
+
+    def time_force_text_noop(self, text):
+        force_text(self.text)
+
+    def time_force_bytes(self, text):
+        force_bytes(self.text)
+
+    def time_force_bytes_noop(self, text):
+        force_bytes(self.bytes)
+
+    def time_force_text_loop(self, text):
+        [force_text(value) for value in self.bytes_batch]
+
+    def time_force_text_many(self, text):
+        force_text_many(self.bytes_batch)
+
+    def time_force_bytes_loop(self, text):
+        [force_bytes(value) for value in self.texts]
+
+    def time_force_bytes_many(self, text):
+        force_bytes_many(self.texts)
+
+
+class IriToUri(object):
+    params = ['ascii', 'unicode']
+    param_names = ['text']
+
+    def setup(self, text):
+        self.iris = ['/%s/' % value for value in
+                     batch(ASCII if text == 'ascii' else UNICODE)]
+
+    def time_iri_to_uri_loop(self, text):
+        [iri_to_uri(iri) for iri in self.iris]
+
+    def time_iri_to_uri_many(self, text):
+        iri_to_uri_many(self.iris)
+
+
+class Truncate(object):
+    def time_chars(self):
+        Truncator(ASCII).chars(50)
+
+    def time_words(self):
+        Truncator(ASCII).words(10)
+
+    def time_words_html(self):
+        Truncator(HTML).words(10, html=True)
+
+
+class TruncateMany(object):
+    def setup(self):
+        self.texts = batch(ASCII, length=200)
+
+    def time_words_loop(self):
+        [Truncator(text).words(10) for text in self.texts]
+
+    def time_truncate_many(self):
+        truncate_many(self.texts, 10)
+
+
+class Wrap(object):
+    def setup(self):
+        self.texts = batch(ASCII, length=200)
+
+    def time_wrap_loop(self):
+        [wrap(text, 40) for text in self.texts]
+
+    def time_wrap_many(self):
+        wrap_many(self.texts, 40)
+
+
+class Slugify(object):
+    params = ['ascii', 'unicode']
+    param_names = ['text']
+
+    def setup(self, text):
+        self.text = ASCII[:60] if text == 'ascii' else UNICODE[:60]
+
+    def time_slugify(self, text):
+        slugify(self.text)
+
+
+class SlugifyMany(object):
+    params = ['ascii', 'unicode']
+    param_names = ['text']
+
+    def setup(self, text):
+        self.texts = batch(ASCII if text == 'ascii' else UNICODE)
+
+    def time_slugify_loop(self, text):
+        [slugify(value) for value in self.texts]
+
+    def time_slugify_many(self, text):
+        slugify_many(self.texts)
+
+
+class Escaping(object):
+    def setup(self):
+        self.texts = batch(UNICODE + '"quoted" \'text\'\n')
+        self.html = batch('Caf&eacute; &amp; &#8364;5 &lt;b&gt; ' * 10)
+
+    def time_javascript_quote_loop(self):
+        [javascript_quote(text) for text in self.texts]
+
+    def time_javascript_quote_many(self):
+        javascript_quote_many(self.texts)
+
+    def time_unescape_entities_loop(self):
+        [unescape_entities(text) for text in self.html]
+
+    def time_unescape_entities_many(self):
+        unescape_entities_many(self.html)
+
+    def time_mark_safe_loop(self):
+        [mark_safe(text) for text in self.texts]
+
+    def time_mark_safe_many(self):
+        mark_safe_many(self.texts)
+
+
+class CompressSequence(object):
+    params = [10, 100]
+    param_names = ['chunks']
+
+    def setup(self, chunks):
+        self.sequence = [ASCII.encode('ascii')] * chunks
+
+    def time_compress_sequence(self, chunks):
+        for chunk in compress_sequence(self.sequence):
+            pass
@@ -0,0 +1,132 @@
+"""
+A minimal runner for the asv-style benchmarks in this directory, for when asv
+isn't available. Results are written as JSON, and can be compared against the
+results of a previous run to catch regressions:
+
+    python -m benchmarks.run -o new.json --compare old.json
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import timeit
+
+import pydsettings
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _param_sets(cls):
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    if not params or not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def discover(pattern=None):
+    """
+    Yield (name, class, method name, params) for every benchmark whose name
+    matches the given regular expression.
+    """
+    for filename in sorted(os.listdir(BENCHMARK_DIR)):
+        if not (filename.startswith('bench_') and filename.endswith('.py')):
+            continue
+        module = importlib.import_module('benchmarks.%s' % filename[:-3])
+        for cls_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                continue
+            for attr in sorted(dir(cls)):
+                if not attr.startswith('time_'):
+                    continue
+                for params in _param_sets(cls):
+                    name = '%s.%s.%s' % (module.__name__.split('.')[-1],
+                                         cls_name, attr)
+                    if params:
+                        name += '(%s)' % ', '.join(repr(p) for p in params)
+                    if pattern is None or re.search(pattern, name):
+                        yield name, cls, attr, params
+
+
+def run_benchmark(cls, attr, params, repeat=5, min_time=0.2):
+    """
+    Return the per-call times, in seconds, of each of ``repeat`` runs.
+    """
+    instance = cls()
+    if hasattr(instance, 'setup'):
+        instance.setup(*params)
+    try:
+        func = getattr(instance, attr)
+        timer = timeit.Timer(lambda: func(*params))
+        number = 1
+        while timer.timeit(number) < min_time / repeat:
+            number *= 10
+        return [t / number for t in timer.repeat(repeat, number)]
+    finally:
+        if hasattr(instance, 'teardown'):
+            instance.teardown(*params)
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the benchmarks slower than the baseline by more than ``threshold``
+    (a ratio) and return how many there were.
+    """
+    regressions = 0
+    for name, result in sorted(results['benchmarks'].items()):
+        old = baseline['benchmarks'].get(name)
+        if old is None:
+            continue
+        ratio = result['min'] / old['min']
+        if ratio > threshold:
+            regressions += 1
+            print('REGRESSION %s: %.3g -> %.3g s (x%.2f)'
+                  % (name, old['min'], result['min'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-b', '--bench', help='only run benchmarks matching '
+                        'this regular expression')
+    parser.add_argument('-o', '--output', help='write results to this file')
+    parser.add_argument('--compare', help='compare against this results file')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = {
+        'version': '.'.join(str(v) for v in pydsettings.__version__),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'benchmarks': {},
+    }
+    for name, cls, attr, params in discover(args.bench):
+        times = run_benchmark(cls, attr, params, args.repeat)
+        times.sort()
+        results['benchmarks'][name] = {
+            'min': times[0],
+            'median': times[len(times) // 2],
+            'times': times,
+        }
+        print('%-60s %.3g s' % (name, times[0]))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+# Settings module used by the module-backed benchmarks.
+from pydsettings.conf import derived
+
+DEBUG = False
+CACHE_BACKEND = 'locmem'
+CACHE_TIMEOUT = 300
+INSTALLED_APPS = ('app1', 'app2', 'app3')
+CACHE_LOCATION = derived(lambda s: '%s:%s' % (s.CACHE_BACKEND, s.CACHE_TIMEOUT))
@@ -6,15 +6,54 @@ variable, and then from django.conf.global_settings; see the global settings fil
 a list of all possible variables.
 """
 
+from bisect import bisect_left, insort
+from functools import wraps
 import importlib
 import os
+import time
 
 from pydsettings import empty
 from pydsettings.exceptions import ImproperlyConfigured
 from pydsettings.utils.functional import LazyObject, empty
+from pydsettings.utils.module_loading import (resolve_settings_paths,
+    warmup_imports)
 
 ENVIRONMENT_VARIABLE = "PYCONF_MODULE"
 global_settings = empty
+# The settings holders that have derived settings cached, by id; see
+# _invalidate_derived().
+_deriving = None
+
+
+class derived(object):
+    """
+    Declares a setting whose value is computed from other settings, e.g.
+
+        DATABASE_URL = derived(lambda s: 'postgres://%s/' % s.DATABASE_HOST)
+
+    The function is passed the settings it is read from, so an override or
+    a tenant overlay that changes a setting it reads gets its own value, and
+    is called on first read. Its result is cached, by the settings object
+    holding it, until one of the settings it read changes.
+    """
+    def __init__(self, func):
+        self.func = func
+
+
+class _DependencyRecorder(object):
+    """
+    Passed to a derived setting's function to record the settings it reads.
+    """
+    def __init__(self, settings):
+        self._settings = settings
+        self._names = set()
+
+    def __getattr__(self, name):
+        self._names.add(name)
+        value = getattr(self._settings, name)
+        if value.__class__ is derived:
+            return _derive(self._settings, name, value)
+        return value
 
 class LazySettings(LazyObject):
     """
@@ -22,6 +61,11 @@ class LazySettings(LazyObject):
     The user can manually configure settings prior to using them. Otherwise,
     Django uses the settings module pointed to by PYSETTINGS_MODULE.
     """
+    # Settings holding dotted paths to resolve on setup; see resolve_paths().
+    _path_settings = ()
+    # How many UserSettingsHolders snapshot() stacks before flattening them.
+    max_snapshot_depth = 4
+
     def _setup(self, name=None):
         """
         Load the settings module pointed to by the environment variable. This
@@ -41,11 +85,61 @@ class LazySettings(LazyObject):
                 % (desc, ENVIRONMENT_VARIABLE))
 
         self._wrapped = Settings(settings_module)
+        self._resolve_paths(self._path_settings)
 
     def __getattr__(self, name):
         if self._wrapped is empty:
             self._setup(name)
-        return getattr(self._wrapped, name)
+        wrapped = self._wrapped
+        value = getattr(wrapped, name)
+        if value.__class__ is derived:
+            return _derive(wrapped, name, value)
+        return value
+    # For reads by the library itself, which enable_instrumentation() doesn't
+    # count.
+    _get = __getattr__
+
+    def __setattr__(self, name, value):
+        if name == '_wrapped' and getattr(value, '_frozen', False):
+            # Settings frozen by snapshot() being put back, e.g. by
+            # override_settings on exit: take changes in a new layer.
+            value = _SnapshotLayer(value)
+        super(LazySettings, self).__setattr__(name, value)
+
+    def snapshot(self):
+        """
+        Return a token for the current settings, which restore() goes back
+        to. The current settings are frozen and later changes go to a new
+        UserSettingsHolder over them, so snapshots cost O(1) and share all
+        they have in common. Once snapshots are stacked max_snapshot_depth
+        deep they are flattened into one.
+        """
+        if self._wrapped is empty:
+            self._setup()
+        frozen = self._wrapped
+        if (isinstance(frozen, _SnapshotLayer) and
+                not frozen._index and not frozen._deleted):
+            # Nothing changed since the last snapshot or restore.
+            return SettingsSnapshot(frozen.default_settings)
+        depth = 0
+        bottom = frozen
+        while isinstance(bottom, _SnapshotLayer):
+            depth += 1
+            bottom = bottom.default_settings
+        if depth > self.max_snapshot_depth:
+            frozen = _flatten(frozen, bottom)
+        _freeze(frozen)
+        self._wrapped = _SnapshotLayer(frozen)
+        return SettingsSnapshot(frozen)
+
+    def restore(self, snapshot):
+        """
+        Go back, in O(1), to the settings at the time of the given snapshot.
+        Unlike override_settings, this doesn't send setting_changed.
+        """
+        if not isinstance(snapshot, SettingsSnapshot):
+            raise TypeError("restore() takes a token returned by snapshot().")
+        self._wrapped = _SnapshotLayer(snapshot._settings)
 
     def configure(self, default_settings=global_settings, **options):
         """
@@ -59,6 +153,86 @@ class LazySettings(LazyObject):
         for name, value in options.items():
             setattr(holder, name, value)
         self._wrapped = holder
+        self._resolve_paths(self._path_settings)
+
+    def resolve_paths(self, *names):
+        """
+        Resolve the dotted paths held by the given settings once the settings
+        are set up, or right away if they already are, so that later
+        cached_import_by_path() calls for them don't import anything. All
+        resolution errors are raised together as one ImproperlyConfigured.
+        """
+        self.__dict__['_path_settings'] = self._path_settings + names
+        if self._wrapped is not empty:
+            self._resolve_paths(names)
+
+    def warmup(self, names=None, max_workers=None):
+        """
+        Import the modules referenced by the given dotted-path settings, by
+        default those declared with resolve_paths(), ahead of time, e.g.
+        before a server starts taking traffic, instead of on first use.
+        Returns a per-path timing report; see warmup_imports(). Don't call
+        it at import time, as it imports on a thread pool.
+        """
+        if self._wrapped is empty:
+            self._setup()
+        if names is None:
+            names = self._path_settings
+        return warmup_imports(self._wrapped, names, max_workers)
+
+    def _resolve_paths(self, names):
+        # Settings are usually set up by their first read, which is often a
+        # module reading them at import time. Resolving on a thread pool then
+        # deadlocks if a pool thread imports that module too, so resolve them
+        # in the calling thread.
+        if names:
+            resolve_settings_paths(self._wrapped, names, max_workers=1)
+
+    def get_many(self, names):
+        """
+        Return a dict of the values of the given settings. Like a cache's
+        get_many(), names that aren't set are left out.
+        """
+        if self._wrapped is empty:
+            self._setup()
+        wrapped = self._wrapped
+        values = {}
+        for name in names:
+            value = getattr(wrapped, name, empty)
+            if value.__class__ is derived:
+                value = _derive(wrapped, name, value)
+            if value is not empty:
+                values[name] = value
+        return values
+
+    def as_dict(self):
+        """
+        Return a dict of all the settings.
+        """
+        return self.get_many(self._names(''))
+
+    def namespace(self, prefix):
+        """
+        Return a dict of the settings whose names start with prefix, keyed by
+        the rest of the name, e.g. settings.namespace('CACHE_')['TIMEOUT'].
+        """
+        values = self.get_many(self._names(prefix))
+        return dict((name[len(prefix):], value)
+                    for name, value in values.items())
+
+    def _names(self, prefix):
+        if self._wrapped is empty:
+            self._setup()
+        return _setting_names(self._wrapped, prefix)
+
+    def fingerprint(self, names=None):
+        """
+        Return a digest of the effective settings, or of only the given
+        settings, as a hex string. See Settings.fingerprint().
+        """
+        if self._wrapped is empty:
+            self._setup()
+        return _fingerprint(self._wrapped, names)
 
     @property
     def configured(self):
@@ -68,12 +242,298 @@ class LazySettings(LazyObject):
         return self._wrapped is not empty
 
 
+class SettingsSnapshot(object):
+    """
+    A token for the settings at the time of LazySettings.snapshot().
+    """
+    __slots__ = ('_settings',)
+
+    def __init__(self, settings):
+        self._settings = settings
+
+
+def _raw_setting(holder, name):
+    """
+    Return the setting called name of holder as it was set, without
+    computing it if it's derived, looking through the layers under holder
+    and any LazySettings among them.
+    """
+    while True:
+        if isinstance(holder, UserSettingsHolder):
+            value = holder.__dict__.get(name, empty)
+            if value is not empty:
+                return value
+            if name in holder._deleted:
+                raise AttributeError(name)
+            holder = holder.default_settings
+        elif isinstance(holder, LazySettings):
+            if holder._wrapped is empty:
+                holder._setup(name)
+            holder = holder._wrapped
+        else:
+            return getattr(holder, name)
+
+
+def _derive(holder, name, value):
+    """
+    Return the derived setting called name of holder, computed from the
+    settings of holder and cached in it.
+    """
+    state = holder.__dict__
+    values = state.get('_derived_values')
+    if values is None:
+        values = _watch_derived(holder)
+    try:
+        return values[name]
+    except KeyError:
+        pass
+    version = state.get('_derived_version', 0)
+    recorder = _DependencyRecorder(holder)
+    result = value.func(recorder)
+    dependents = state['_dependents']
+    for dependency in recorder._names:
+        dependents.setdefault(dependency, set()).add(name)
+    values[name] = result
+    if state.get('_derived_version', 0) != version:
+        # Settings changed while it was computed, so the result may be
+        # stale; don't keep it.
+        values.pop(name, None)
+    return result
+
+
+def _watch_derived(holder):
+    # Imported here so that importing this module doesn't pull in
+    # pysignals and threading.
+    import weakref
+    from pydsettings.signals import setting_changed
+    global _deriving
+    if _deriving is None:
+        _deriving = weakref.WeakValueDictionary()
+        # Catches setting_changed sent by code that doesn't call
+        # _invalidate_derived() first.
+        setting_changed.connect(_setting_changed)
+    holder.__dict__.update(_derived_values={}, _dependents={})
+    _deriving[id(holder)] = holder
+    return holder.__dict__['_derived_values']
+
+
+def _invalidate(holder, name):
+    """
+    Drop the cached value of the given setting of holder, if it is derived,
+    and of the derived settings of holder that depend on it, directly or
+    not.
+    """
+    state = holder.__dict__
+    state['_derived_version'] = state.get('_derived_version', 0) + 1
+    state['_derived_values'].pop(name, None)
+    for derived_name in state['_dependents'].pop(name, ()):
+        _invalidate(holder, derived_name)
+
+
+def _setting_changed(setting, **kwargs):
+    _invalidate_derived(setting)
+
+
+def _invalidate_derived(name):
+    """
+    Drop the cached derived settings that depend on the setting called name
+    from every settings holder. Holders do this themselves when one of their
+    settings is set or deleted, as the holders over them may have cached
+    derived settings that read it. Whatever changes settings otherwise must
+    call this before sending setting_changed, so that the receivers read
+    up-to-date derived settings.
+    """
+    if _deriving is not None:
+        for holder in list(_deriving.values()):
+            _invalidate(holder, name)
+
+
+def _freeze(holder):
+    """
+    Mark holder, and the settings objects under it, as frozen by a snapshot,
+    so that LazySettings never makes them take changes again. Stops at the
+    first one already frozen, as everything under it is too.
+    """
+    while (isinstance(holder, (Settings, UserSettingsHolder)) and
+            not holder._frozen):
+        holder.__dict__['_frozen'] = True
+        holder = holder.__dict__.get('default_settings')
+
+
+def _flatten(holder, bottom):
+    """
+    Return one _SnapshotLayer over bottom with the same settings as the
+    given stack of them, in time proportional to what they hold.
+    """
+    layers = []
+    while holder is not bottom:
+        layers.append(holder)
+        holder = holder.default_settings
+    flat = _SnapshotLayer(bottom)
+    for layer in reversed(layers):
+        for name in layer._deleted:
+            if name in flat.__dict__:
+                delattr(flat, name)
+            else:
+                flat._deleted.add(name)
+        for name in layer._index:
+            setattr(flat, name, layer.__dict__[name])
+    return flat
+
+
+def _prefixed(index, prefix):
+    """
+    Return the names in the sorted list index that start with prefix.
+    """
+    if not prefix:
+        return index
+    names = []
+    for i in range(bisect_left(index, prefix), len(index)):
+        if not index[i].startswith(prefix):
+            break
+        names.append(index[i])
+    return names
+
+
+def _setting_names(obj, prefix):
+    """
+    Return the set of names of the settings on obj that start with prefix.
+
+    Settings and UserSettingsHolder keep a sorted index of their settings, so
+    this costs O(k) in the number of matching settings, per layer of
+    overrides. Any other object is looked up with dir().
+    """
+    names_for = getattr(obj, '_setting_names', None)
+    if names_for is None:
+        return set(name for name in dir(obj)
+                   if name.isupper() and name.startswith(prefix))
+    return names_for(prefix)
+
+
+def _canonical(value):
+    """
+    Return a string representation of value that doesn't depend on the
+    ordering of dicts and sets, for hashing values that may be unhashable.
+    """
+    if isinstance(value, dict):
+        return '{%s}' % ', '.join(sorted(
+            '%s: %s' % (_canonical(k), _canonical(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return '%s({%s})' % (type(value).__name__,
+                             ', '.join(sorted(_canonical(v) for v in value)))
+    if isinstance(value, (list, tuple)):
+        return '%s(%s)' % (type(value).__name__,
+                           ', '.join(_canonical(v) for v in value))
+    if value.__class__ is derived:
+        return 'derived(%s)' % _function_key(value.func)
+    return repr(value)
+
+
+def _function_key(func):
+    """
+    Return a string that identifies the function of a derived setting in any
+    process: its own _canonical(), if it has one (secret providers have), or
+    else where it is defined and its code, so that two lambdas on one line
+    differ. Values it closes over aren't included. The settings it reads are
+    hashed on their own.
+    """
+    canonical = getattr(func, '_canonical', None)
+    if canonical is not None:
+        return canonical()
+    code = getattr(func, '__code__', None)
+    return '%s.%s:%s' % (
+        getattr(func, '__module__', None),
+        getattr(func, '__qualname__', type(func).__qualname__),
+        _code_key(code) if code is not None else '')
+
+
+def _code_key(code):
+    # repr() of a nested code object holds its address, so those are
+    # replaced by their own key.
+    consts = [_code_key(const) if hasattr(const, 'co_code') else repr(const)
+              for const in code.co_consts]
+    return '%d:%r:%r:%r' % (code.co_firstlineno, code.co_code, consts,
+                            code.co_names)
+
+
+def _setting_hash(name, value):
+    """
+    Return a 64-bit hash of a setting, stable across processes as long as
+    the repr() of its value is.
+    """
+    from hashlib import blake2b
+    data = ('%s=%s' % (name, _canonical(value))).encode('utf-8', 'replace')
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'big')
+
+
+def _fingerprint_state(obj):
+    """
+    Return the XOR of the hashes of the settings on obj, and a version that
+    changes whenever that may have changed.
+    """
+    state = getattr(obj, '_fingerprint_state', None)
+    if state is not None:
+        return state()
+    fingerprint = 0
+    for name in dir(obj):
+        if name.isupper():
+            fingerprint ^= _setting_hash(name, getattr(obj, name))
+    return fingerprint, 0
+
+
+def _key_hash(obj, name):
+    """
+    Return the hash of the setting called name on obj, or 0 if it isn't set.
+    """
+    key_hash = getattr(obj, '_key_hash', None)
+    if key_hash is not None:
+        return key_hash(name)
+    value = getattr(obj, name, empty)
+    if value is empty or not name.isupper():
+        return 0
+    return _setting_hash(name, value)
+
+
+def _rehash_setting(obj, name):
+    """
+    Update the fingerprint of obj, and of the settings under it, after the
+    value of the setting called name changed in place, such as a rotated
+    secret.
+    """
+    while obj is not None:
+        if (getattr(obj, '_hashes', None) is not None and
+                name in obj.__dict__):
+            obj._rehash(name, obj.__dict__[name])
+        obj = getattr(obj, 'default_settings', None)
+
+
+def _fingerprint(obj, names):
+    if names is None:
+        fingerprint = _fingerprint_state(obj)[0]
+    else:
+        fingerprint = 0
+        for name in set(names):
+            fingerprint ^= _key_hash(obj, name)
+    return '%016x' % fingerprint
+
+
 class Settings(object):
+    # Set once LazySettings.snapshot() has frozen these settings.
+    _frozen = False
+    # Hashes of the settings, kept up to date once fingerprint() is used.
+    _hashes = None
+    _fingerprint = 0
+    _version = 0
+    # Settings still holding their global_settings value.
+    _defaults = frozenset()
+
     def __init__(self, settings_module):
+        self.__dict__['_index'] = []
         # update this dict from global settings (but only for ALL_CAPS settings)
         for setting in dir(global_settings):
             if setting == setting.upper():
                 setattr(self, setting, getattr(global_settings, setting))
+        self.__dict__['_defaults'] = set(self._index)
 
         # store the settings module in case someone later cares
         self.SETTINGS_MODULE = settings_module
@@ -91,6 +551,59 @@ class Settings(object):
                 setting_value = getattr(mod, setting)
                 setattr(self, setting, setting_value)
 
+    def __setattr__(self, name, value):
+        if name.isupper():
+            if name not in self.__dict__:
+                insort(self._index, name)
+            if self._hashes is not None:
+                self._rehash(name, value)
+            if name in self._defaults:
+                self._defaults.remove(name)
+            _invalidate_derived(name)
+        return super(Settings, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        super(Settings, self).__delattr__(name)
+        if name.isupper():
+            del self._index[bisect_left(self._index, name)]
+            if name in self._defaults:
+                self._defaults.remove(name)
+            _invalidate_derived(name)
+            if self._hashes is not None:
+                self._rehash(name, empty)
+
+    def _setting_names(self, prefix):
+        return set(_prefixed(self._index, prefix))
+
+    def fingerprint(self, names=None):
+        """
+        Return a digest of the settings, or of only the given settings, as a
+        hex string. Values are hashed by a canonical serialization, so they
+        needn't be hashable, and dicts and sets hash the same whatever their
+        ordering. The digest is the XOR of per-setting hashes, updated as
+        settings change, so once computed it costs O(1) to read.
+        """
+        return _fingerprint(self, names)
+
+    def _rehash(self, name, value):
+        new = 0 if value is empty else _setting_hash(name, value)
+        old = self._hashes.pop(name, 0)
+        if new:
+            self._hashes[name] = new
+        self.__dict__['_fingerprint'] = self._fingerprint ^ old ^ new
+        self.__dict__['_version'] = self._version + 1
+
+    def _fingerprint_state(self):
+        if self._hashes is None:
+            self.__dict__['_hashes'] = {}
+            for name in self._index:
+                self._rehash(name, self.__dict__[name])
+        return self._fingerprint, self._version
+
+    def _key_hash(self, name):
+        self._fingerprint_state()
+        return self._hashes.get(name, 0)
+
 
 class UserSettingsHolder(object):
     """
@@ -99,6 +612,16 @@ class UserSettingsHolder(object):
     # SETTINGS_MODULE doesn't make much sense in the manually configured
     # (standalone) case.
     SETTINGS_MODULE = None
+    # Set once LazySettings.snapshot() has frozen the holder.
+    _frozen = False
+    # Hashes of the settings set on the holder itself, and what XORing them
+    # and the deletions into the fingerprint of default_settings amounts to,
+    # kept up to date once fingerprint() is used.
+    _hashes = None
+    _correction = 0
+    _version = 0
+    _default_version = None
+    _default_fingerprint = 0
 
     def __init__(self, default_settings):
         """
@@ -106,26 +629,298 @@ class UserSettingsHolder(object):
         from the module specified in default_settings (if possible).
         """
         self.__dict__['_deleted'] = set()
+        self.__dict__['_index'] = []
         self.default_settings = default_settings
 
     def __getattr__(self, name):
         if name in self._deleted:
             raise AttributeError
-        return getattr(self.default_settings, name)
+        if not name.isupper():
+            return getattr(self.default_settings, name)
+        # Derived settings under this holder are computed from its settings,
+        # not from those of the holder they were set on.
+        value = _raw_setting(self.default_settings, name)
+        if value.__class__ is derived:
+            return _derive(self, name, value)
+        return value
 
     def __setattr__(self, name, value):
+        if name.isupper():
+            if self._hashes is not None:
+                self._rehash(name, value)
+            if name not in self.__dict__:
+                insort(self._index, name)
+            _invalidate_derived(name)
         self._deleted.discard(name)
         return super(UserSettingsHolder, self).__setattr__(name, value)
 
     def __delattr__(self, name):
+        if name.isupper() and self._hashes is not None:
+            self._rehash(name, empty)
         self._deleted.add(name)
-        return super(UserSettingsHolder, self).__delattr__(name)
+        super(UserSettingsHolder, self).__delattr__(name)
+        if name.isupper():
+            del self._index[bisect_left(self._index, name)]
+            _invalidate_derived(name)
+
+    def _setting_names(self, prefix):
+        names = _setting_names(self.default_settings, prefix)
+        names.difference_update(self._deleted)
+        names.update(_prefixed(self._index, prefix))
+        return names
+
+    def fingerprint(self, names=None):
+        """
+        Return a digest of the effective settings, or of only the given
+        settings, as a hex string; see Settings.fingerprint().
+        """
+        return _fingerprint(self, names)
+
+    def _rehash(self, name, value):
+        # Called before the setting changes, to swap its old hash for the new.
+        new = 0 if value is empty else _setting_hash(name, value)
+        if name in self._hashes:
+            old = self._hashes.pop(name)
+        elif name in self._deleted:
+            old = 0
+        else:
+            old = _key_hash(self.default_settings, name)
+        if new:
+            self._hashes[name] = new
+        self.__dict__['_correction'] = self._correction ^ old ^ new
+        self.__dict__['_version'] = self._version + 1
+
+    def _fingerprint_state(self):
+        default = self.default_settings
+        state = getattr(default, '_fingerprint_state', None)
+        if state is not None:
+            fingerprint, version = state()
+        elif self._hashes is None:
+            # Other objects, such as modules, are taken not to change.
+            fingerprint, version = _fingerprint_state(default)
+            self.__dict__['_default_fingerprint'] = fingerprint
+        else:
+            fingerprint, version = self._default_fingerprint, 0
+        if self._hashes is None or version != self._default_version:
+            if self._hashes is None:
+                self.__dict__['_hashes'] = dict(
+                    (name, _setting_hash(name, self.__dict__[name]))
+                    for name in self._index)
+            correction = 0
+            for name, key_hash in self._hashes.items():
+                correction ^= _key_hash(default, name) ^ key_hash
+            for name in self._deleted:
+                if name.isupper() and name not in self._hashes:
+                    correction ^= _key_hash(default, name)
+            self.__dict__['_correction'] = correction
+            self.__dict__['_default_version'] = version
+        return fingerprint ^ self._correction, self._version + version
+
+    def _key_hash(self, name):
+        if not name.isupper() or name in self._deleted:
+            return 0
+        if name in self.__dict__:
+            if self._hashes is not None:
+                return self._hashes[name]
+            return _setting_hash(name, self.__dict__[name])
+        return _key_hash(self.default_settings, name)
 
     def __dir__(self):
         return list(self.__dict__) + dir(self.default_settings)
 
+
+class _SnapshotLayer(UserSettingsHolder):
+    """
+    The UserSettingsHolder that LazySettings.snapshot() and restore() put
+    over frozen settings to take later changes.
+    """
+    def __delattr__(self, name):
+        # Deleting a setting of the frozen settings hides it, as deleting it
+        # before the snapshot would have.
+        try:
+            _raw_setting(self, name)
+            inherited = name not in self.__dict__
+        except AttributeError:
+            inherited = False
+        try:
+            super(_SnapshotLayer, self).__delattr__(name)
+        except AttributeError:
+            if not inherited:
+                raise
+
+
 settings = LazySettings()
 
+
+class LatencyHistogram(object):
+    """
+    A cumulative latency histogram with fixed buckets, in seconds.
+    """
+    buckets = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, float('inf'))
+
+    def __init__(self):
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class SettingsStats(object):
+    """
+    What enable_instrumentation() records: reads per setting, reads that fell
+    through to the global default settings (misses), and the time spent
+    setting up the settings and entering and exiting override_settings.
+    """
+    timings = ('setup', 'override_enter', 'override_exit')
+
+    def __init__(self):
+        self.reads = {}
+        self.misses = {}
+        self.latency = dict((name, LatencyHistogram()) for name in self.timings)
+
+    def reset(self):
+        # The instrumented methods hold on to the counter dicts.
+        self.reads.clear()
+        self.misses.clear()
+        self.latency = dict((name, LatencyHistogram()) for name in self.timings)
+
+    def as_dict(self):
+        return {
+            'reads': dict(self.reads),
+            'misses': dict(self.misses),
+            'latency': dict((name, histogram.as_dict())
+                            for name, histogram in self.latency.items()),
+        }
+
+    def as_prometheus(self, prefix='pydsettings'):
+        """
+        Returns the stats in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, counts, help_text in (
+                ('setting_reads_total', self.reads,
+                 'Reads of each setting.'),
+                ('setting_misses_total', self.misses,
+                 'Reads of each setting satisfied by the default settings.')):
+            name = '%s_%s' % (prefix, name)
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s counter' % name)
+            for setting, count in sorted(counts.items()):
+                lines.append('%s{setting="%s"} %d' % (name, setting, count))
+        for timing in self.timings:
+            name = '%s_%s_seconds' % (prefix, timing)
+            histogram = self.latency[timing].as_dict()
+            lines.append('# HELP %s Time spent in %s.' % (name, timing))
+            lines.append('# TYPE %s histogram' % name)
+            for bound, count in histogram['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('%s_bucket{le="%s"} %d' % (name, le, count))
+            lines.append('%s_sum %r' % (name, histogram['sum']))
+            lines.append('%s_count %d' % (name, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+settings_stats = SettingsStats()
+
+
+def _from_defaults(holder, name):
+    """
+    Return whether reading the setting ``name`` from ``holder`` falls through
+    to the global default settings.
+    """
+    while True:
+        if isinstance(holder, LazySettings):
+            holder = holder._wrapped
+        elif isinstance(holder, UserSettingsHolder):
+            if name in holder.__dict__ or name in type(holder).__dict__:
+                return False
+            holder = holder.default_settings
+        elif isinstance(holder, Settings):
+            return name in holder._defaults
+        else:
+            return True
+
+
+def _count(lock):
+    reads, misses = settings_stats.reads, settings_stats.misses
+
+    def decorator(getattr_):
+        @wraps(getattr_)
+        def __getattr__(self, name):
+            with lock:
+                reads[name] = reads.get(name, 0) + 1
+            value = getattr_(self, name)
+            if _from_defaults(self._wrapped, name):
+                with lock:
+                    misses[name] = misses.get(name, 0) + 1
+            return value
+        return __getattr__
+    return decorator
+
+
+def _timed(timing, lock):
+    def decorator(func):
+        @wraps(func)
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                with lock:
+                    settings_stats.latency[timing].observe(seconds)
+        return inner
+    return decorator
+
+# The methods replaced by enable_instrumentation(), to be put back by
+# disable_instrumentation().
+_instrumented = {}
+
+
+def enable_instrumentation():
+    """
+    Start recording settings_stats. The instrumented methods are swapped in
+    on the classes themselves, so that when instrumentation is disabled (the
+    default) reading settings costs nothing extra.
+    """
+    import threading
+    from pydsettings.decorators import override_settings
+    if _instrumented:
+        return
+    # Settings can be read from many threads at once.
+    lock = threading.Lock()
+    for cls, name, decorator in (
+            (LazySettings, '__getattr__', _count(lock)),
+            (LazySettings, '_setup', _timed('setup', lock)),
+            (override_settings, 'enable', _timed('override_enter', lock)),
+            (override_settings, 'disable', _timed('override_exit', lock))):
+        original = _instrumented[cls, name] = cls.__dict__[name]
+        setattr(cls, name, decorator(original))
+
+
+def disable_instrumentation():
+    """
+    Stop recording settings_stats. The collected stats are kept.
+    """
+    while _instrumented:
+        (cls, name), original = _instrumented.popitem()
+        setattr(cls, name, original)
+
+
 def init(environment_variable, default_module=empty):
     ENVIRONMENT_VARIABLE = environment_variable
     global_settings = default_module
@@ -0,0 +1,301 @@
+"""
+Settings served to the processes on a host over a Unix domain socket.
+
+SettingsServer holds the authoritative settings. Each SettingsClient fetches
+all of them when it connects and then gets pushed the changes, and is meant
+to be used as the default settings of a process's own settings:
+
+    settings.configure(default_settings=SettingsClient(path).start())
+
+Messages are JSON documents, one per line, so setting values must be JSON
+serializable (tuples come back as lists).
+"""
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import socketserver
+import threading
+
+from pydsettings.conf import _invalidate_derived, _setting_hash
+from pydsettings.exceptions import ImproperlyConfigured
+from pydsettings.signals import setting_changed
+from pydsettings.utils.functional import empty
+
+logger = logging.getLogger(__name__)
+
+
+def _message(kind, version, **data):
+    data.update(type=kind, version=version)
+    return json.dumps(data, sort_keys=True).encode('utf-8') + b'\n'
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.settings_server
+        sock = self.request
+        sock.settimeout(server.send_timeout)
+        # The messages for this client, in version order. They are sent by
+        # a thread of its own, so that a client that stops reading holds up
+        # neither the server nor the other clients.
+        messages = queue.Queue()
+        with server._lock:
+            messages.put(_message('snapshot', server.version,
+                                  settings=server._values))
+            server._clients[sock] = messages
+        writer = threading.Thread(target=self._write, args=(messages,))
+        writer.daemon = True
+        writer.start()
+        try:
+            # Clients don't send anything; wait for them to go away.
+            while True:
+                try:
+                    if not sock.recv(4096):
+                        break
+                except socket.timeout:
+                    pass
+        except OSError:
+            pass
+        finally:
+            with server._lock:
+                server._clients.pop(sock, None)
+            messages.put(None)
+            writer.join()
+
+    def _write(self, messages):
+        while True:
+            message = messages.get()
+            if message is None:
+                return
+            try:
+                self.request.sendall(message)
+            except OSError:
+                # The client went away, or didn't read for send_timeout
+                # seconds; a partly sent message can't be taken back, so
+                # drop it. That ends handle() too.
+                _shutdown(self.request)
+                return
+
+
+def _shutdown(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class SettingsServer(object):
+    """
+    Serves settings on the Unix socket at path. update() changes them and
+    pushes what changed to every connected client. A client that doesn't
+    take a message within send_timeout seconds is disconnected.
+    """
+    def __init__(self, path, values=None, send_timeout=5.0):
+        self.path = path
+        self.version = 0
+        self.send_timeout = send_timeout
+        self._values = dict(values or {})
+        # The message queue of each client, by socket.
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socketserver.ThreadingUnixStreamServer(
+            self.path, _ClientHandler)
+        self._server.daemon_threads = True
+        self._server.settings_server = self
+        thread = threading.Thread(target=self._server.serve_forever,
+                                  kwargs={'poll_interval': 0.1})
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        with self._lock:
+            for sock in self._clients:
+                _shutdown(sock)
+            self._clients.clear()
+        self._server.server_close()
+        os.unlink(self.path)
+
+    def update(self, values=None, deleted=()):
+        """
+        Set the given dict of settings and delete the named ones, and push
+        the settings that actually changed to the clients. Returns the new
+        version.
+        """
+        with self._lock:
+            changed = dict((name, value)
+                           for name, value in (values or {}).items()
+                           if self._values.get(name, empty) != value)
+            removed = [name for name in deleted if name in self._values]
+            if not changed and not removed:
+                return self.version
+            self._values.update(changed)
+            for name in removed:
+                del self._values[name]
+            self.version += 1
+            message = _message('diff', self.version, set=changed,
+                               deleted=removed)
+            for messages in self._clients.values():
+                messages.put(message)
+            return self.version
+
+
+class SettingsClient(object):
+    """
+    Read access to the settings of the SettingsServer at path. Changes are
+    applied as a whole, and setting_changed is sent, from the client's own
+    thread, for each setting that changed; errors raised by its receivers
+    are ignored, so they can't stop the client. When the connection drops the
+    client keeps the settings it last had and reconnects, backing off
+    exponentially up to max_backoff seconds. If cache_path is given, the
+    settings are also saved there and used when the server can't be
+    reached at start.
+    """
+    def __init__(self, path, cache_path=None, max_backoff=30.0):
+        self.__dict__.update(
+            path=path, cache_path=cache_path, max_backoff=max_backoff,
+            version=0, connected=False, _values={},
+            _ready=threading.Event(), _closed=threading.Event(),
+            _lock=threading.Lock(),
+            _sock=None, _thread=None, _changes=0, _fingerprint=(0, 0))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise TypeError("Settings from a SettingsServer are read-only.")
+
+    def __dir__(self):
+        return list(self._values)
+
+    def start(self, timeout=5.0):
+        """
+        Connect and wait up to timeout seconds for the settings. Falls back
+        to the cached settings, if any, when the server can't be reached.
+        """
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        self.__dict__['_thread'] = thread
+        thread.start()
+        if not self._ready.wait(timeout):
+            values = self._load_cache()
+            if values is None:
+                self.close()
+                raise ImproperlyConfigured(
+                    "Couldn't get the settings from %s." % self.path)
+            self._apply(values)
+        return self
+
+    def close(self):
+        self._closed.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        backoff = 0.05
+        while not self._closed.is_set():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                self._closed.wait(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = 0.05
+            self.__dict__.update(_sock=sock, connected=True)
+            try:
+                for line in sock.makefile('rb'):
+                    self._receive(json.loads(line.decode('utf-8')))
+            except (OSError, ValueError):
+                # Connection errors and undecodable messages; reconnecting
+                # gets a fresh snapshot.
+                pass
+            except Exception:
+                # Anything else is a bug, but the client must keep running.
+                logger.exception("Error handling a message from %s.",
+                                 self.path)
+            finally:
+                self.__dict__.update(_sock=None, connected=False)
+                sock.close()
+
+    def _receive(self, message):
+        if message['type'] == 'snapshot':
+            values = message['settings']
+        else:
+            values = dict(self._values)
+            values.update(message['set'])
+            for name in message['deleted']:
+                values.pop(name, None)
+        self._apply(values, message['version'])
+        self._save_cache()
+
+    def _apply(self, values, version=None):
+        """
+        Switch to the given settings, from the server at the given version,
+        or from the cache if version is None.
+        """
+        with self._lock:
+            if version is None and self._ready.is_set():
+                # The server's settings came in meanwhile.
+                return
+            old = self._values
+            self.__dict__['_values'] = values
+            self.__dict__['_changes'] = self._changes + 1
+            changed = [name for name in set(old) | set(values)
+                       if old.get(name, empty) != values.get(name, empty)]
+            for name in changed:
+                _invalidate_derived(name)
+            for name in changed:
+                setting_changed.send_robust(
+                    sender=self.__class__, setting=name,
+                    value=values.get(name), enter=True)
+            if version is not None:
+                self.__dict__['version'] = version
+                self._ready.set()
+
+    def _load_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        with open(self.cache_path) as f:
+            return json.load(f)
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        tmp_path = '%s.tmp' % self.cache_path
+        with open(tmp_path, 'w') as f:
+            json.dump(self._values, f)
+        os.rename(tmp_path, self.cache_path)
+
+    def _setting_names(self, prefix):
+        return set(name for name in self._values
+                   if name.isupper() and name.startswith(prefix))
+
+    def _fingerprint_state(self):
+        values, changes = self._values, self._changes
+        version, fingerprint = self._fingerprint
+        if version != changes:
+            fingerprint = 0
+            for name, value in values.items():
+                if name.isupper():
+                    fingerprint ^= _setting_hash(name, value)
+            self.__dict__['_fingerprint'] = (changes, fingerprint)
+        return fingerprint, changes
@@ -1,5 +1,6 @@
 from functools import wraps
-from pydsettings.conf import settings, UserSettingsHolder
+from pydsettings.conf import (settings, UserSettingsHolder,
+    _invalidate_derived)
 from pydsettings.signals import setting_changed
 
 
@@ -19,19 +20,83 @@ class override_settings(object):
     def __exit__(self, exc_type, exc_value, traceback):
         self.disable()
 
-    def __call__(self, func):
-        @wraps(func)
+    def __call__(self, test_func):
+        if isinstance(test_func, type):
+            return self.decorate_class(test_func)
+
+        @wraps(test_func)
         def inner(*args, **kwargs):
             with self:
-                return func(*args, **kwargs)
+                return test_func(*args, **kwargs)
         return inner
 
+    def decorate_class(self, cls):
+        """
+        Override the settings once for the whole TestCase class, from
+        setUpClass to tearDownClass, rather than around every test. The
+        options of decorated base classes are merged in, with the ones
+        of subclasses taking precedence, and so are those of stacked
+        decorators, with the outermost one taking precedence.
+        """
+        from unittest import TestCase
+        if not issubclass(cls, TestCase):
+            raise TypeError("Only unittest.TestCase subclasses can be "
+                            "decorated with override_settings.")
+        options = dict(getattr(cls, '_overridden_settings', {}))
+        options.update(self.options)
+        stacked = '_overridden_settings' in cls.__dict__
+        cls._overridden_settings = options
+        if stacked:
+            # The class was already decorated; its setUpClass enables the
+            # merged options.
+            return cls
+
+        setup = cls.__dict__.get('setUpClass')
+        teardown = cls.__dict__.get('tearDownClass')
+
+        def setUpClass(klass):
+            # Only the outermost decorated class in the MRO enables the
+            # override, which already holds the options of its bases.
+            owner = klass.__dict__.get('_class_override') is None
+            if owner:
+                override = override_settings(**klass._overridden_settings)
+                override.enable()
+                klass._class_override = (cls, override)
+            try:
+                if setup is not None:
+                    setup.__func__(klass)
+                else:
+                    super(cls, klass).setUpClass()
+            except Exception:
+                if owner:
+                    del klass._class_override
+                    override.disable()
+                raise
+
+        def tearDownClass(klass):
+            try:
+                if teardown is not None:
+                    teardown.__func__(klass)
+                else:
+                    super(cls, klass).tearDownClass()
+            finally:
+                owner, override = klass.__dict__['_class_override']
+                if owner is cls:
+                    del klass._class_override
+                    override.disable()
+
+        cls.setUpClass = classmethod(setUpClass)
+        cls.tearDownClass = classmethod(tearDownClass)
+        return cls
+
     def enable(self):
         override = UserSettingsHolder(settings._wrapped)
         for key, new_value in self.options.items():
             setattr(override, key, new_value)
         self.wrapped = settings._wrapped
         settings._wrapped = override
+        for key in self.options:
+            _invalidate_derived(key)
         for key, new_value in self.options.items():
             setting_changed.send(sender=settings._wrapped.__class__,
                                  setting=key, value=new_value, enter=True)
@@ -40,6 +105,11 @@ class override_settings(object):
         settings._wrapped = self.wrapped
         del self.wrapped
         for key in self.options:
-            new_value = getattr(settings, key, None)
+            _invalidate_derived(key)
+        for key in self.options:
+            try:
+                new_value = settings._get(key)
+            except AttributeError:
+                new_value = None
             setting_changed.send(sender=settings._wrapped.__class__,
                                  setting=key, value=new_value, enter=False)
@@ -1,2 +1,13 @@
 class ImproperlyConfigured(Exception):
     pass
+
+
+class ReceiverErrors(Exception):
+    """
+    The errors raised by the receivers of a concurrently dispatched signal,
+    as a list of (receiver, exception) pairs.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super(ReceiverErrors, self).__init__('\n'.join(
+            '%r: %r' % (receiver, error) for receiver, error in errors))
@@ -0,0 +1,198 @@
+"""
+Settings whose values are secrets fetched, and refreshed, from providers.
+
+A secret is declared in the settings like a derived setting:
+
+    DATABASE_PASSWORD = secret(FileSecretProvider('/run/secrets/db', ttl=300))
+
+and a SecretManager, started from the application's event loop, fetches all
+of them concurrently and refreshes each one before its TTL runs out. Reads
+never wait on a provider: they get the last value fetched.
+"""
+import asyncio
+
+from pydsettings.conf import (_invalidate_derived, _rehash_setting,
+    _setting_names, derived, settings)
+from pydsettings.exceptions import ImproperlyConfigured
+from pydsettings.signals import setting_changed
+from pydsettings.utils.functional import empty
+
+
+def secret(provider):
+    """
+    Declare a setting whose value comes from the given SecretProvider.
+    """
+    return derived(provider)
+
+
+class SecretProvider(object):
+    """
+    Base class for secret providers, which implement the fetch() coroutine.
+    A fetched value is good for ttl seconds.
+    """
+    ttl = 300
+
+    def __init__(self, ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+        self.value = empty
+        # How many times the SecretManager changed the value.
+        self.generation = 0
+        # When the SecretManager should fetch the value next, in event loop
+        # time.
+        self.refresh_at = 0
+
+    async def fetch(self):
+        raise NotImplementedError
+
+    def _canonical(self):
+        # What fingerprints of the settings hash for this secret. Never its
+        # value, which a fingerprint mustn't give away: the provider and its
+        # generation, so that rotating the secret changes them. These differ
+        # between processes, unlike what other settings hash.
+        return '%s@%x#%d' % (type(self).__name__, id(self), self.generation)
+
+    def __call__(self, settings):
+        if self.value is empty:
+            raise ImproperlyConfigured(
+                "The secret from %r hasn't been fetched; start a "
+                "SecretManager first." % self)
+        return self.value
+
+
+class FileSecretProvider(SecretProvider):
+    """
+    Reads a secret from a file, such as one mounted by a container runtime.
+    """
+    def __init__(self, path, ttl=None, encoding='utf-8'):
+        super(FileSecretProvider, self).__init__(ttl)
+        self.path = path
+        self.encoding = encoding
+
+    def __repr__(self):
+        return '<FileSecretProvider %s>' % self.path
+
+    async def fetch(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._read)
+
+    def _read(self):
+        with open(self.path, encoding=self.encoding) as f:
+            return f.read().rstrip('\n')
+
+
+class MemorySecretProvider(SecretProvider):
+    """
+    Holds a secret in memory, standing in for a real provider in tests.
+    set() changes what the next fetch returns, and setting an exception
+    makes fetches fail.
+    """
+    def __init__(self, value, ttl=None):
+        super(MemorySecretProvider, self).__init__(ttl)
+        self.stored = value
+        self.error = None
+
+    def set(self, value):
+        self.stored = value
+
+    async def fetch(self):
+        if self.error is not None:
+            raise self.error
+        return self.stored
+
+
+class SecretManager(object):
+    """
+    Fetches and refreshes the secrets declared in settings. Each secret is
+    fetched again once refresh_ratio of its TTL has passed; if that fails
+    the last value is kept and the fetch is retried after retry_interval
+    seconds. setting_changed is sent when a secret's value changes; errors
+    raised by its receivers are ignored, so they can't stop the refreshes.
+    """
+    def __init__(self, settings=settings, refresh_ratio=0.8,
+                 retry_interval=5.0):
+        self.settings = settings
+        self.refresh_ratio = refresh_ratio
+        self.retry_interval = retry_interval
+        self.providers = {}
+        self._task = None
+
+    async def start(self):
+        """
+        Fetch every secret, raising ImproperlyConfigured if any can't be
+        fetched, and start refreshing them in the background.
+        """
+        self.providers = self._find_providers()
+        errors = await self.refresh(self.providers)
+        if errors:
+            raise ImproperlyConfigured('\n'.join(
+                '%s: %s' % (name, error)
+                for name, error in sorted(errors.items())))
+        if self.providers:
+            self._task = asyncio.ensure_future(self._refresh_loop())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                # The refreshes had already stopped on an error.
+                pass
+            self._task = None
+
+    async def refresh(self, names=None):
+        """
+        Fetch the named secrets, or all of them, concurrently. Returns a
+        dict of the errors raised by the ones that couldn't be fetched.
+        """
+        if names is None:
+            names = self.providers
+        names = list(names)
+        results = await asyncio.gather(
+            *[self.providers[name].fetch() for name in names],
+            return_exceptions=True)
+        now = asyncio.get_running_loop().time()
+        errors = {}
+        for name, result in zip(names, results):
+            provider = self.providers[name]
+            if isinstance(result, Exception):
+                errors[name] = result
+                provider.refresh_at = now + self.retry_interval
+                continue
+            provider.refresh_at = now + provider.ttl * self.refresh_ratio
+            if result != provider.value:
+                provider.value = result
+                provider.generation += 1
+                _invalidate_derived(name)
+                _rehash_setting(self.settings._wrapped, name)
+                setting_changed.send_robust(
+                    sender=self.__class__, setting=name, value=result,
+                    enter=True)
+        return errors
+
+    async def _refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            refresh_at = min(provider.refresh_at
+                             for provider in self.providers.values())
+            await asyncio.sleep(max(refresh_at - loop.time(), 0))
+            now = loop.time()
+            await self.refresh([name
+                                for name, provider in self.providers.items()
+                                if provider.refresh_at <= now])
+
+    def _find_providers(self):
+        if not self.settings.configured:
+            self.settings._setup()
+        wrapped = self.settings._wrapped
+        providers = {}
+        for name in _setting_names(wrapped, ''):
+            value = getattr(wrapped, name, None)
+            if (value.__class__ is derived and
+                    isinstance(value.func, SecretProvider)):
+                providers[name] = value.func
+        return providers
@@ -0,0 +1,146 @@
+"""
+Settings shared between processes through a shared memory segment.
+
+One process publishes snapshots of its settings with SharedSettingsPublisher,
+and any number of processes on the same host read them through
+SharedSettings, typically as the default settings of their own settings:
+
+    settings.configure(default_settings=SharedSettings('myapp-settings'))
+
+Snapshots are encoded as JSON, like the settings daemon's messages, so that
+reading one can't run code. Setting values must be JSON serializable, and
+tuples are read back as lists. Each process still decodes the whole snapshot
+into its own dict, so this saves the publishing work, not memory.
+"""
+import json
+from multiprocessing import shared_memory
+import struct
+
+from pydsettings.conf import _setting_hash
+
+# The segment starts with the snapshot version and length; the JSON encoded
+# snapshot follows. Odd versions mean a snapshot is being written.
+_header = struct.Struct('<QQ')
+# Names of the segments published by this process.
+_published = set()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Before Python 3.13 every process attaching to a segment registers
+        # it with the resource tracker, which unlinks it when that process
+        # exits; only the publisher should.
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name)
+        if name not in _published:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedSettingsPublisher(object):
+    """
+    Owns a shared memory segment of the given size and publishes settings
+    snapshots into it. There must be a single publisher per segment.
+    """
+    def __init__(self, name=None, size=1024 * 1024):
+        self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _published.add(self._shm.name)
+        self.version = 0
+        _header.pack_into(self._shm.buf, 0, 0, 0)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def publish(self, values):
+        """
+        Publish a dict of settings as the new snapshot. Readers see either
+        the previous snapshot or this one, never a partly written one.
+        """
+        data = json.dumps(dict(values), sort_keys=True).encode('utf-8')
+        if _header.size + len(data) > self._shm.size:
+            raise ValueError(
+                "Settings snapshot of %d bytes doesn't fit in the %d bytes "
+                "of shared memory." % (len(data), self._shm.size - _header.size))
+        buf = self._shm.buf
+        _header.pack_into(buf, 0, self.version + 1, len(data))
+        buf[_header.size:_header.size + len(data)] = data
+        self.version += 2
+        _header.pack_into(buf, 0, self.version, len(data))
+        return self.version
+
+    def close(self):
+        """
+        Stop publishing and remove the segment.
+        """
+        _published.discard(self._shm.name)
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedSettings(object):
+    """
+    Read access to the settings published into the named segment. Each read
+    checks the snapshot version, without locking, and only decodes the
+    snapshot again when it has changed.
+    """
+    def __init__(self, name):
+        self.__dict__['_shm'] = _attach(name)
+        self.__dict__['_version'] = 0
+        self.__dict__['_values'] = {}
+        self.__dict__['_fingerprint'] = (0, 0)
+
+    def __getattr__(self, name):
+        try:
+            return self._snapshot()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise TypeError("Shared settings are read-only; publish a new "
+                        "snapshot instead.")
+
+    def __dir__(self):
+        return list(self._snapshot())
+
+    @property
+    def version(self):
+        """
+        The version of the snapshot last read.
+        """
+        return self._version
+
+    def _snapshot(self):
+        buf = self._shm.buf
+        while True:
+            version, length = _header.unpack_from(buf, 0)
+            if version == self._version or version & 1:
+                # Unchanged, or being written: keep using the last snapshot.
+                return self._values
+            data = bytes(buf[_header.size:_header.size + length])
+            if _header.unpack_from(buf, 0)[0] == version:
+                break
+        values = json.loads(data.decode('utf-8'))
+        self.__dict__['_values'] = values
+        self.__dict__['_version'] = version
+        return values
+
+    def _setting_names(self, prefix):
+        return set(name for name in self._snapshot()
+                   if name.isupper() and name.startswith(prefix))
+
+    def _fingerprint_state(self):
+        values = self._snapshot()
+        version, fingerprint = self._fingerprint
+        if version != self._version:
+            fingerprint = 0
+            for name, value in values.items():
+                if name.isupper():
+                    fingerprint ^= _setting_hash(name, value)
+            self.__dict__['_fingerprint'] = (self._version, fingerprint)
+        return fingerprint, self._version
+
+    def close(self):
+        self._shm.close()
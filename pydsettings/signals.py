@@ -1,3 +1,120 @@
+import contextvars
+import sys
+import threading
+
 from pysignals import Signal
+from pysignals.dispatcher import NO_RECEIVERS
+
+from pydsettings.exceptions import ReceiverErrors
+
+
+class SettingSignal(Signal):
+    """
+    A Signal whose receivers can be run concurrently on a thread pool; see
+    enable_concurrent_dispatch(). Either way send() only returns once every
+    receiver is done.
+    """
+    executor = None
+    _worker = threading.local()
+
+    def _concurrent_send(self, sender, **named):
+        # Read once, as disable_concurrent_dispatch() may reset it meanwhile.
+        executor = self.executor
+        receivers = self._concurrent_receivers(sender, executor)
+        if receivers is None:
+            return Signal.send(self, sender, **named)
+        results = self._dispatch(executor, receivers, sender, named)
+        errors = [(receiver, exc_info[1])
+                  for receiver, response, exc_info in results if exc_info]
+        if errors:
+            raise ReceiverErrors(errors)
+        return [(receiver, response) for receiver, response, _ in results]
+
+    def _concurrent_send_robust(self, sender, **named):
+        executor = self.executor
+        receivers = self._concurrent_receivers(sender, executor)
+        if receivers is None:
+            return Signal.send_robust(self, sender, **named)
+        return [(receiver, exc_info or response)
+                for receiver, response, exc_info
+                in self._dispatch(executor, receivers, sender, named)]
+
+    def _concurrent_receivers(self, sender, executor):
+        """
+        Return the receivers to run concurrently, or None to run them one
+        at a time as usual: when concurrent dispatch was just disabled, when
+        there are fewer than two receivers, or when sending from a receiver
+        that is itself running on the pool, which could otherwise deadlock
+        it.
+        """
+        if (executor is None or getattr(self._worker, 'active', False) or
+                not self.receivers or
+                self.sender_receivers_cache.get(sender) is NO_RECEIVERS):
+            return None
+        receivers = self._live_receivers(sender)
+        return receivers if len(receivers) > 1 else None
+
+    def _dispatch(self, executor, receivers, sender, named):
+        futures = []
+        inline = [receivers[0]]
+        for receiver in receivers[1:]:
+            # Receivers see the sender's context variables, each in a copy
+            # of its own, as a context can't be entered by two threads.
+            try:
+                futures.append(executor.submit(
+                    contextvars.copy_context().run,
+                    self._call, receiver, sender, named))
+            except RuntimeError:
+                # The pool was shut down meanwhile.
+                inline.append(receiver)
+        # The caller's thread would only wait, so it runs a receiver too.
+        results = [self._call(receiver, sender, named, worker=False)
+                   for receiver in inline]
+        results.extend(future.result() for future in futures)
+        return results
+
+    def _call(self, receiver, sender, named, worker=True):
+        self._worker.active = worker
+        try:
+            response = receiver(signal=self, sender=sender, **named)
+        except Exception:
+            return receiver, None, sys.exc_info()
+        finally:
+            self._worker.active = False
+        return receiver, response, None
+
+
+setting_changed = SettingSignal(providing_args=["setting", "value", "enter"])
+
+
+def enable_concurrent_dispatch(max_workers=None):
+    """
+    Run the receivers of setting_changed concurrently on a thread pool, so
+    that a settings change takes as long as its slowest receiver rather than
+    all of them together. Receivers must not depend on each other's order.
+    Errors raised by receivers are collected and raised together, as
+    ReceiverErrors, once all of them are done.
+
+    Receivers run on the pool see the context variables of the thread
+    sending the signal, but not its threading.local() state, such as
+    per-thread connections or request data kept in thread locals.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    disable_concurrent_dispatch()
+    setting_changed.executor = ThreadPoolExecutor(max_workers)
+    # Swapped in on the instance, so that serial dispatch costs nothing
+    # extra.
+    setting_changed.send = setting_changed._concurrent_send
+    setting_changed.send_robust = setting_changed._concurrent_send_robust
+
 
-setting_changed = Signal(providing_args=["setting", "value", "enter"])
+def disable_concurrent_dispatch():
+    """
+    Go back to running the receivers of setting_changed one at a time.
+    """
+    executor = setting_changed.executor
+    if executor is not None:
+        del setting_changed.send
+        del setting_changed.send_robust
+        setting_changed.executor = None
+        executor.shutdown()
@@ -0,0 +1,86 @@
+"""
+Per-tenant settings on top of one shared base settings object.
+"""
+from collections import OrderedDict
+import threading
+
+from pydsettings.conf import UserSettingsHolder, settings
+
+
+class TenantSettings(object):
+    """
+    A registry of per-tenant settings. Each tenant gets a UserSettingsHolder
+    overlay holding only its own overrides, and reads anything else through
+    to the shared base settings, so a tenant costs memory in proportion to
+    its overrides.
+
+    Overlays are created on demand from loader, a callable that takes a list
+    of tenant ids and returns a dict mapping each of them to a dict of its
+    overrides (tenants left out have none). At most max_tenants overlays
+    are kept; the least recently used ones are dropped and loaded again
+    when next needed.
+    """
+    def __init__(self, loader, base=settings, max_tenants=1000):
+        if max_tenants < 1:
+            raise ValueError("max_tenants must be at least 1.")
+        self.loader = loader
+        self.base = base
+        self.max_tenants = max_tenants
+        self._overlays = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, tenant):
+        with self._lock:
+            overlay = self._overlays.get(tenant)
+            if overlay is not None:
+                self._overlays.move_to_end(tenant)
+                return overlay
+        return self.load([tenant])[tenant]
+
+    def __contains__(self, tenant):
+        return tenant in self._overlays
+
+    def __len__(self):
+        return len(self._overlays)
+
+    def load(self, tenants):
+        """
+        Return a dict mapping each of the given tenants to its settings,
+        loading all the ones that aren't cached with a single loader call.
+        """
+        tenants = list(OrderedDict.fromkeys(tenants))
+        with self._lock:
+            missing = [tenant for tenant in tenants
+                       if tenant not in self._overlays]
+        overrides = self.loader(missing) if missing else {}
+        result = {}
+        with self._lock:
+            overlays = self._overlays
+            for tenant in tenants:
+                overlay = overlays.get(tenant)
+                if overlay is None:
+                    overlay = self._overlay(overrides.get(tenant, {}))
+                    overlays[tenant] = overlay
+                else:
+                    overlays.move_to_end(tenant)
+                result[tenant] = overlay
+            while len(overlays) > self.max_tenants:
+                overlays.popitem(last=False)
+        return result
+
+    def invalidate(self, tenant=None):
+        """
+        Drop the settings of the given tenant, or of all tenants, so that
+        they are loaded again on next use.
+        """
+        with self._lock:
+            if tenant is None:
+                self._overlays.clear()
+            else:
+                self._overlays.pop(tenant, None)
+
+    def _overlay(self, overrides):
+        overlay = UserSettingsHolder(self.base)
+        for name, value in overrides.items():
+            setattr(overlay, name, value)
+        return overlay
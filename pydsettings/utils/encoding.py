@@ -1,15 +1,14 @@
 from __future__ import unicode_literals
 
 import codecs
-import datetime
-from decimal import Decimal
-import locale
+from functools import lru_cache
+import re
 try:
     from urllib.parse import quote
 except ImportError:     # Python 2
     from urllib import quote
 
-from pystorages.utils.functional import Promise
+from pydsettings.utils.functional import Promise
 import six
 
 class DjangoUnicodeDecodeError(UnicodeDecodeError):
@@ -47,14 +46,26 @@ def smart_text(s, encoding='utf-8', strings_only=False, errors='strict'):
         return s
     return force_text(s, encoding, strings_only, errors)
 
+_protected_types = None
+
+def _get_protected_types():
+    global _protected_types
+    if _protected_types is None:
+        # Imported here rather than at module level, so that importing this
+        # module doesn't pay for them.
+        import datetime
+        from decimal import Decimal
+        _protected_types = six.integer_types + (type(None), float, Decimal,
+            datetime.datetime, datetime.date, datetime.time)
+    return _protected_types
+
 def is_protected_type(obj):
     """Determine if the object instance is of a protected type.
 
     Objects of protected types are preserved as-is when passed to
     force_text(strings_only=True).
     """
-    return isinstance(obj, six.integer_types + (type(None), float, Decimal,
-        datetime.datetime, datetime.date, datetime.time))
+    return isinstance(obj, _get_protected_types())
 
 def force_text(s, encoding='utf-8', strings_only=False, errors='strict'):
     """
@@ -118,7 +129,7 @@ def force_bytes(s, encoding='utf-8', strings_only=False, errors='strict'):
 
     If strings_only is True, don't convert (some) non-string-like objects.
     """
-    if isinstance(s, six.memoryview):
+    if isinstance(s, memoryview):
         s = bytes(s)
     if isinstance(s, bytes):
         if encoding == 'utf-8':
@@ -146,6 +157,184 @@ def force_bytes(s, encoding='utf-8', strings_only=False, errors='strict'):
     else:
         return s.encode(encoding, errors)
 
+# How force_text_many() and force_bytes_many() convert a value, decided once
+# per type (and strings_only flag) and cached in the tables below.
+_KEEP, _FORCE, _DECODE, _ENCODE, _STR, _LIST, _TUPLE, _DICT = range(8)
+_containers = {list: _LIST, tuple: _TUPLE, dict: _DICT}
+_text_kinds = ({}, {})
+_bytes_kinds = ({}, {})
+
+def _text_kind(type_, strings_only):
+    if type_ in _containers:
+        return _containers[type_]
+    if issubclass(type_, six.text_type):
+        return _KEEP
+    if strings_only and issubclass(type_, _get_protected_types()):
+        return _KEEP
+    if six.PY3 and type_ is bytes:
+        return _DECODE
+    if (six.PY3 and not issubclass(type_, (bytes, Promise)) and
+            not hasattr(type_, '__unicode__')):
+        return _STR
+    return _FORCE
+
+def force_text_many(values, encoding='utf-8', strings_only=False,
+                    errors='strict'):
+    """
+    Returns a list with force_text() applied to every item of ``values``,
+    or a dict if ``values`` is a dict. Lists, tuples and dicts (keys and
+    values) are converted recursively.
+
+    The conversion to use is looked up by the exact type of each value, so
+    this is much cheaper than calling force_text() on every item.
+    """
+    kinds = _text_kinds[bool(strings_only)]
+    get_kind = kinds.get
+
+    def convert(s):
+        kind = get_kind(type(s))
+        if kind is None:
+            kind = kinds[type(s)] = _text_kind(type(s), strings_only)
+        if kind == _KEEP:
+            return s
+        if kind == _STR:
+            return six.text_type(s)
+        if kind == _DECODE:
+            try:
+                return s.decode(encoding, errors)
+            except UnicodeDecodeError as e:
+                raise DjangoUnicodeDecodeError(s, *e.args)
+        if kind == _FORCE:
+            return force_text(s, encoding, strings_only, errors)
+        if kind == _LIST:
+            return [convert(v) for v in s]
+        if kind == _TUPLE:
+            return tuple([convert(v) for v in s])
+        return dict([(convert(k), convert(v)) for k, v in s.items()])
+
+    if isinstance(values, dict):
+        return dict([(convert(k), convert(v)) for k, v in values.items()])
+    return [s if get_kind(type(s)) == _KEEP else convert(s) for s in values]
+
+def _bytes_kind(type_, strings_only, encoding):
+    if type_ in _containers:
+        return _containers[type_]
+    if issubclass(type_, bytes):
+        return _KEEP if encoding == 'utf-8' else _FORCE
+    if strings_only and (type_ is type(None) or issubclass(type_, int)):
+        return _KEEP
+    if issubclass(type_, six.text_type):
+        return _ENCODE
+    if (six.PY3 and
+            not issubclass(type_, (memoryview, Promise, BaseException))):
+        return _STR
+    return _FORCE
+
+def force_bytes_many(values, encoding='utf-8', strings_only=False,
+                     errors='strict'):
+    """
+    Returns a list with force_bytes() applied to every item of ``values``,
+    or a dict if ``values`` is a dict. Lists, tuples and dicts (keys and
+    values) are converted recursively.
+
+    The conversion to use is looked up by the exact type of each value, so
+    this is much cheaper than calling force_bytes() on every item.
+    """
+    if encoding == 'utf-8':
+        kinds = _bytes_kinds[bool(strings_only)]
+    else:
+        # Bytes have to be recoded, so the cached kinds don't apply.
+        kinds = {}
+    get_kind = kinds.get
+
+    def convert(s):
+        kind = get_kind(type(s))
+        if kind is None:
+            kind = kinds[type(s)] = _bytes_kind(type(s), strings_only, encoding)
+        if kind == _KEEP:
+            return s
+        if kind == _ENCODE:
+            return s.encode(encoding, errors)
+        if kind == _STR:
+            return six.text_type(s).encode(encoding, errors)
+        if kind == _FORCE:
+            return force_bytes(s, encoding, strings_only, errors)
+        if kind == _LIST:
+            return [convert(v) for v in s]
+        if kind == _TUPLE:
+            return tuple([convert(v) for v in s])
+        return dict([(convert(k), convert(v)) for k, v in s.items()])
+
+    if isinstance(values, dict):
+        return dict([(convert(k), convert(v)) for k, v in values.items()])
+    return [s if get_kind(type(s)) == _KEEP else convert(s) for s in values]
+
+def _iter_chunks(stream, chunk_size):
+    if not hasattr(stream, 'read'):
+        return iter(stream)
+    return iter(lambda: stream.read(chunk_size) or None, None)
+
+def force_text_stream(stream, encoding='utf-8', errors='strict',
+                      chunk_size=64 * 1024):
+    """
+    Yields the text of a stream of chunks, where ``stream`` is a file-like
+    object or an iterable of chunks. Bytes are decoded incrementally, so
+    multi-byte sequences split across chunks are handled and memory use is
+    bounded by the chunk size. Other chunks go through force_text().
+
+    A decoding error raises DjangoUnicodeDecodeError for the chunk in which
+    it is found.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    for chunk in _iter_chunks(stream, chunk_size):
+        if isinstance(chunk, memoryview):
+            chunk = bytes(chunk)
+        if isinstance(chunk, bytes):
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError as e:
+                raise DjangoUnicodeDecodeError(chunk, *e.args)
+        else:
+            text = force_text(chunk, encoding, errors=errors)
+        if text:
+            yield text
+    try:
+        text = decoder.decode(b'', final=True)
+    except UnicodeDecodeError as e:
+        raise DjangoUnicodeDecodeError(b'', *e.args)
+    if text:
+        yield text
+
+def force_bytes_stream(stream, encoding='utf-8', errors='strict',
+                       chunk_size=64 * 1024):
+    """
+    Yields the bytes of a stream of chunks, where ``stream`` is a file-like
+    object or an iterable of chunks, encoded with ``encoding``. Text is
+    encoded incrementally (so stateful encodings such as UTF-16 emit their BOM
+    only once). Like force_bytes(), bytes chunks are taken to be UTF-8 and
+    are passed through as-is when ``encoding`` is UTF-8.
+    """
+    encoder = codecs.getincrementalencoder(encoding)(errors)
+    recode = codecs.lookup(encoding).name != 'utf-8'
+    decoder = codecs.getincrementaldecoder('utf-8')(errors)
+    for chunk in _iter_chunks(stream, chunk_size):
+        if isinstance(chunk, memoryview):
+            chunk = bytes(chunk)
+        if isinstance(chunk, bytes):
+            if not recode:
+                if chunk:
+                    yield chunk
+                continue
+            chunk = decoder.decode(chunk)
+        else:
+            chunk = force_text(chunk, errors=errors)
+        data = encoder.encode(chunk)
+        if data:
+            yield data
+    data = encoder.encode(decoder.decode(b'', final=True), final=True)
+    if data:
+        yield data
+
 if six.PY3:
     smart_str = smart_text
     force_str = force_text
@@ -191,8 +380,16 @@ def iri_to_uri(iri):
     # converted.
     if iri is None:
         return iri
+    if type(iri) is six.text_type and _iri_safe_re.match(iri):
+        # Nothing would be quoted.
+        return iri
     return quote(force_bytes(iri), safe=b"/#%[]=:;$&()+,!?*@'~")
 
+# Characters left alone by iri_to_uri() and filepath_to_uri(): the ones
+# urllib's quote() never quotes plus the respective ``safe`` characters.
+_iri_safe_re = re.compile(r"[A-Za-z0-9_.\-~/#%\[\]=:;$&()+,!?*@']*\Z")
+_filepath_safe_re = re.compile(r"[A-Za-z0-9_.\-~/!*()']*\Z")
+
 def filepath_to_uri(path):
     """Convert a file system path to a URI portion that is suitable for
     inclusion in a URL.
@@ -210,14 +407,74 @@ def filepath_to_uri(path):
         return path
     # I know about `os.sep` and `os.altsep` but I want to leave
     # some flexibility for hardcoding separators.
+    if type(path) is six.text_type:
+        path = path.replace("\\", "/")
+        if _filepath_safe_re.match(path):
+            # Nothing would be quoted.
+            return path
     return quote(force_bytes(path).replace(b"\\", b"/"), safe=b"/~!*()'")
 
+_cached_iri_to_uri = lru_cache(maxsize=4096, typed=True)(iri_to_uri)
+_cached_filepath_to_uri = lru_cache(maxsize=4096, typed=True)(filepath_to_uri)
+
+def cached_iri_to_uri(iri):
+    """
+    Like iri_to_uri(), but remembers the results for the 4096 most recently
+    used strings.
+    """
+    if type(iri) in (six.text_type, bytes):
+        return _cached_iri_to_uri(iri)
+    return iri_to_uri(iri)
+cached_iri_to_uri.cache_info = _cached_iri_to_uri.cache_info
+cached_iri_to_uri.cache_clear = _cached_iri_to_uri.cache_clear
+
+def cached_filepath_to_uri(path):
+    """
+    Like filepath_to_uri(), but remembers the results for the 4096 most
+    recently used strings.
+    """
+    if type(path) in (six.text_type, bytes):
+        return _cached_filepath_to_uri(path)
+    return filepath_to_uri(path)
+cached_filepath_to_uri.cache_info = _cached_filepath_to_uri.cache_info
+cached_filepath_to_uri.cache_clear = _cached_filepath_to_uri.cache_clear
+
+def _convert_many(func, values):
+    # Inputs tend to repeat a lot (e.g. asset paths), so convert every
+    # distinct string only once. Keyed by type too, as equal values of
+    # different types (1, True, 1.0) convert differently.
+    seen = {}
+    result = []
+    for value in values:
+        if type(value) not in (six.text_type, bytes):
+            result.append(func(value))
+            continue
+        key = (type(value), value)
+        try:
+            result.append(seen[key])
+        except KeyError:
+            result.append(seen.setdefault(key, func(value)))
+    return result
+
+def iri_to_uri_many(iris):
+    """
+    Returns a list with iri_to_uri() applied to every item of ``iris``.
+    """
+    return _convert_many(iri_to_uri, iris)
+
+def filepath_to_uri_many(paths):
+    """
+    Returns a list with filepath_to_uri() applied to every item of ``paths``.
+    """
+    return _convert_many(filepath_to_uri, paths)
+
 def get_system_encoding():
     """
     The encoding of the default system locale but falls back to the given
     fallback encoding if the encoding is unsupported by python or could
     not be determined.  See tickets #10335 and #5846
     """
+    import locale
     try:
         encoding = locale.getdefaultlocale()[1] or 'ascii'
         codecs.lookup(encoding)
@@ -225,4 +482,10 @@ def get_system_encoding():
         encoding = 'ascii'
     return encoding
 
-DEFAULT_LOCALE_ENCODING = get_system_encoding()
+def __getattr__(name):
+    # DEFAULT_LOCALE_ENCODING is only computed when first used, as looking up
+    # the locale is slow and most users of this module never need it.
+    if name == 'DEFAULT_LOCALE_ENCODING':
+        value = globals()[name] = get_system_encoding()
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -1,9 +1,10 @@
-import imp
+from collections import namedtuple
 from importlib import import_module
-import os
+import importlib.util
 import sys
+import time
 
-from pystorages.exceptions import ImproperlyConfigured
+from pydsettings.exceptions import ImproperlyConfigured
 import six
 
 
@@ -32,6 +33,163 @@ def import_by_path(dotted_path, error_prefix=''):
     return attr
 
 
+# Results of cached_import_by_path(), keyed by dotted path.
+_import_cache = {}
+
+
+def cached_import_by_path(dotted_path, error_prefix=''):
+    """
+    Like import_by_path(), but remembers what every dotted path resolved to,
+    so resolving the same path again is a dictionary lookup. Failures aren't
+    cached.
+    """
+    try:
+        return _import_cache[dotted_path]
+    except KeyError:
+        pass
+    attr = _import_cache[dotted_path] = import_by_path(dotted_path, error_prefix)
+    return attr
+
+
+def resolve_settings_paths(settings, names, max_workers=None):
+    """
+    Resolve the dotted paths held by the settings ``names`` through
+    cached_import_by_path() and return a dict mapping every name to the
+    resolved object. A setting can hold a single path or a list or tuple of
+    paths, in which case it maps to a list or tuple of objects.
+
+    Paths under different top-level packages don't depend on each other and
+    are imported concurrently on a thread pool of ``max_workers`` threads;
+    pass ``max_workers=1`` when this may run while a module is imported.
+    Every failure is collected and reported in a single ImproperlyConfigured.
+    """
+    names = list(names)
+    values = dict((name, getattr(settings, name)) for name in names)
+    # Remember the first setting each path came from for error messages.
+    sources = {}
+    for name in names:
+        value = values[name]
+        paths = [value] if isinstance(value, six.string_types) else value
+        for path in paths:
+            sources.setdefault(path, name)
+
+    errors = {}
+
+    def resolve(path):
+        try:
+            cached_import_by_path(path, '%s: ' % sources[path])
+        except ImproperlyConfigured as e:
+            errors[path] = str(e)
+
+    _run_import_plan(resolve, sources, max_workers)
+    if errors:
+        raise ImproperlyConfigured('\n'.join(
+            errors[path] for path in sources if path in errors))
+
+    resolved = {}
+    for name in names:
+        value = values[name]
+        if isinstance(value, six.string_types):
+            resolved[name] = _import_cache[value]
+        else:
+            resolved[name] = type(value)(_import_cache[path] for path in value)
+    return resolved
+
+
+def _run_import_plan(func, paths, max_workers):
+    """
+    Call ``func`` for every dotted path in ``paths``. Paths under different
+    top-level packages don't depend on each other, so each package gets its
+    own task on a thread pool of ``max_workers`` threads, in which its paths
+    are handled in order. With ``max_workers=1`` they are all handled in
+    the calling thread.
+
+    Don't use a pool from code that may run while a module is being
+    imported: the importing thread holds that module's import lock, and a
+    pool thread importing it too would wait on the lock forever.
+    """
+    groups = {}
+    for path in paths:
+        groups.setdefault(path.split('.', 1)[0], []).append(path)
+
+    def run(group):
+        for path in group:
+            func(path)
+
+    if len(groups) > 1 and max_workers != 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers or len(groups)) as executor:
+            list(executor.map(run, groups.values()))
+    else:
+        for group in groups.values():
+            run(group)
+
+
+ImportTiming = namedtuple('ImportTiming', ['path', 'seconds', 'error'])
+
+def warmup_imports(settings, names, max_workers=None):
+    """
+    Resolve, through cached_import_by_path(), the dotted paths held by the
+    settings ``names``, importing the modules they refer to on a thread pool
+    of ``max_workers`` threads. Like in resolve_settings_paths(), a setting
+    can hold a single path or a list or tuple of paths.
+
+    Import failures don't raise; they are reported instead. Returns a list
+    of ImportTiming(path, seconds, error) tuples, slowest first.
+    """
+    paths = []
+    for name in names:
+        value = getattr(settings, name)
+        for path in [value] if isinstance(value, six.string_types) else value:
+            if path not in paths:
+                paths.append(path)
+
+    report = []
+
+    def warm(path):
+        error = None
+        start = time.perf_counter()
+        try:
+            cached_import_by_path(path)
+        except ImproperlyConfigured as e:
+            error = str(e)
+        report.append(ImportTiming(path, time.perf_counter() - start, error))
+
+    _run_import_plan(warm, paths, max_workers)
+    report.sort(key=lambda timing: timing.seconds, reverse=True)
+    return report
+
+
+# Results of module_has_submodule(), keyed by the full module name.
+_submodule_cache = {}
+
+
+class _CacheInvalidator(object):
+    """
+    A meta path finder that never finds anything. It's only there so that
+    importlib.invalidate_caches(), which calls invalidate_caches() on every
+    finder in sys.meta_path, also clears the caches of this module.
+    """
+    @staticmethod
+    def find_spec(fullname, path=None, target=None):
+        return None
+
+    @staticmethod
+    def invalidate_caches():
+        _submodule_cache.clear()
+        _import_cache.clear()
+
+
+# Don't register twice, including a stale copy left by reloading this module.
+sys.meta_path[:] = [
+    finder for finder in sys.meta_path
+    if (getattr(finder, '__module__', None), getattr(finder, '__name__', None)) !=
+    (__name__, '_CacheInvalidator')
+]
+if _CacheInvalidator not in sys.meta_path:
+    sys.meta_path.append(_CacheInvalidator)
+
+
 def module_has_submodule(package, module_name):
     """See if 'module' is in 'package'."""
     name = ".".join([package.__name__, module_name])
@@ -41,58 +199,15 @@ def module_has_submodule(package, module_name):
     except KeyError:
         pass
     try:
-        package_path = package.__path__   # No __path__, then not a package.
-    except AttributeError:
-        # Since the remainder of this function assumes that we're dealing with
-        # a package (module with a __path__), so if it's not, then bail here.
-        return False
-    for finder in sys.meta_path:
-        if finder.find_module(name, package_path):
-            return True
-    for entry in package_path:
-        try:
-            # Try the cached finder.
-            finder = sys.path_importer_cache[entry]
-            if finder is None:
-                # Implicit import machinery should be used.
-                try:
-                    file_, _, _ = imp.find_module(module_name, [entry])
-                    if file_:
-                        file_.close()
-                    return True
-                except ImportError:
-                    continue
-            # Else see if the finder knows of a loader.
-            elif finder.find_module(name):
-                return True
-            else:
-                continue
-        except KeyError:
-            # No cached finder, so try and make one.
-            for hook in sys.path_hooks:
-                try:
-                    finder = hook(entry)
-                    # XXX Could cache in sys.path_importer_cache
-                    if finder.find_module(name):
-                        return True
-                    else:
-                        # Once a finder is found, stop the search.
-                        break
-                except ImportError:
-                    # Continue the search for a finder.
-                    continue
-            else:
-                # No finder found.
-                # Try the implicit import machinery if searching a directory.
-                if os.path.isdir(entry):
-                    try:
-                        file_, _, _ = imp.find_module(module_name, [entry])
-                        if file_:
-                            file_.close()
-                        return True
-                    except ImportError:
-                        pass
-                # XXX Could insert None or NullImporter
-    else:
-        # Exhausted the search, so the module cannot be found.
+        return _submodule_cache[name]
+    except KeyError:
+        pass
+    if not hasattr(package, '__path__'):
+        # Not a package, so it can't have submodules.
         return False
+    try:
+        found = importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        found = False
+    _submodule_cache[name] = found
+    return found
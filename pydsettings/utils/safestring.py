@@ -4,7 +4,7 @@ without further escaping in HTML. Marking something as a "safe string" means
 that the producer of the string has already turned characters that should not
 be interpreted by the HTML engine (e.g. '<') into the appropriate entities.
 """
-from pystorages.utils.functional import curry, Promise, allow_lazy
+from pydsettings.utils.functional import Promise, allow_lazy
 import six
 
 class EscapeData(object):
@@ -51,27 +51,21 @@ class SafeBytes(bytes, SafeData):
             return SafeBytes(t)
         return t
 
-    def _proxy_method(self, *args, **kwargs):
-        """
-        Wrap a call to a normal unicode method up so that we return safe
-        results. The method that is being wrapped is passed in the 'method'
-        argument.
-        """
-        method = kwargs.pop('method')
-        data = method(self, *args, **kwargs)
-        if isinstance(data, bytes):
-            return SafeBytes(data)
-        else:
-            return SafeText(data)
-
-    decode = curry(_proxy_method, method=bytes.decode)
+    def decode(self, *args, **kwargs):
+        return SafeText(bytes.decode(self, *args, **kwargs))
 
 class SafeText(six.text_type, SafeData):
     """
     A unicode (Python 2) / str (Python 3) subclass that has been specifically
     marked as "safe" for HTML output purposes.
     """
-    __new__ = allow_lazy(six.text_type.__new__, six.text_type)
+    _lazy_new = staticmethod(allow_lazy(six.text_type.__new__, six.text_type))
+
+    def __new__(cls, *args, **kwargs):
+        # Plain text can't be lazy, so skip allow_lazy's argument scan.
+        if len(args) == 1 and not kwargs and type(args[0]) is six.text_type:
+            return six.text_type.__new__(cls, args[0])
+        return cls._lazy_new(cls, *args, **kwargs)
 
     def __add__(self, rhs):
         """
@@ -83,20 +77,8 @@ class SafeText(six.text_type, SafeData):
             return SafeText(t)
         return t
 
-    def _proxy_method(self, *args, **kwargs):
-        """
-        Wrap a call to a normal unicode method up so that we return safe
-        results. The method that is being wrapped is passed in the 'method'
-        argument.
-        """
-        method = kwargs.pop('method')
-        data = method(self, *args, **kwargs)
-        if isinstance(data, bytes):
-            return SafeBytes(data)
-        else:
-            return SafeText(data)
-
-    encode = curry(_proxy_method, method=six.text_type.encode)
+    def encode(self, *args, **kwargs):
+        return SafeBytes(six.text_type.encode(self, *args, **kwargs))
 
 if six.PY3:
     SafeString = SafeText
@@ -105,6 +87,55 @@ else:
     # backwards compatibility for Python 2
     SafeUnicode = SafeText
 
+class SafeBuilder(object):
+    """
+    Collects text fragments and joins them once, instead of building the
+    result with repeated ``+``. Like SafeText.__add__, the result is only
+    marked safe if every fragment was safe.
+
+        >>> builder = SafeBuilder()
+        >>> builder.append(mark_safe('<b>'))
+        >>> builder.extend([mark_safe('bold'), mark_safe('</b>')])
+        >>> builder.build()
+        '<b>bold</b>'
+    """
+    def __init__(self, fragments=()):
+        self.fragments = []
+        self.safe = True
+        self.extend(fragments)
+
+    def append(self, s):
+        if not isinstance(s, SafeData):
+            self.safe = False
+        self.fragments.append(s)
+
+    def extend(self, fragments):
+        for s in fragments:
+            self.append(s)
+
+    def __len__(self):
+        return len(self.fragments)
+
+    def build(self):
+        """
+        Returns the joined fragments, as a SafeText if all of them were safe.
+        """
+        text = ''.join(self.fragments)
+        if self.safe:
+            return SafeText(text)
+        return text
+
+def safe_join(sep, fragments):
+    """
+    Joins ``fragments`` with ``sep``. The result is a SafeText if ``sep`` and
+    every fragment are safe, and a plain string otherwise.
+    """
+    builder = SafeBuilder(fragments)
+    text = sep.join(builder.fragments)
+    if builder.safe and isinstance(sep, SafeData):
+        return SafeText(text)
+    return text
+
 def mark_safe(s):
     """
     Explicitly mark a string as safe for (HTML) output purposes. The returned
@@ -136,3 +167,81 @@ def mark_for_escaping(s):
         return EscapeText(s)
     return EscapeBytes(bytes(s))
 
+#
+# Batch variants of mark_safe() and mark_for_escaping(). What to do with a
+# value is decided once per type and cached in the dicts below; None means the
+# value is returned as is. Lazy objects aren't cached, as lazy() creates a new
+# proxy class every time it is called.
+#
+
+def _direct(base, cls):
+    # Builds a cls instance from a value of exactly type ``base``, which can't
+    # be lazy, without going through the allow_lazy'ed __new__.
+    return lambda s: base.__new__(cls, s)
+
+def _delegates_bytes(type_):
+    return issubclass(type_, Promise) and getattr(type_, '_delegate_bytes', False)
+
+def _safe_converter(type_):
+    if issubclass(type_, SafeData):
+        return None
+    if type_ is bytes:
+        return _direct(bytes, SafeBytes)
+    if issubclass(type_, bytes) or _delegates_bytes(type_):
+        return SafeBytes
+    if type_ is six.text_type:
+        return _direct(six.text_type, SafeText)
+    if issubclass(type_, (six.text_type, Promise)):
+        return SafeText
+    return lambda s: SafeString(str(s))
+
+def _escape_converter(type_):
+    if issubclass(type_, (SafeData, EscapeData)):
+        return None
+    if type_ is bytes:
+        return _direct(bytes, EscapeBytes)
+    if issubclass(type_, bytes) or _delegates_bytes(type_):
+        return EscapeBytes
+    if type_ is six.text_type:
+        return _direct(six.text_type, EscapeText)
+    if issubclass(type_, (six.text_type, Promise)):
+        return EscapeText
+    return lambda s: EscapeBytes(bytes(s))
+
+_safe_converters = {}
+_escape_converters = {}
+
+def _convert_stream(values, converters, get_converter):
+    for s in values:
+        try:
+            convert = converters[type(s)]
+        except KeyError:
+            convert = get_converter(type(s))
+            if not isinstance(s, Promise):
+                converters[type(s)] = convert
+        yield s if convert is None else convert(s)
+
+def mark_safe_stream(values):
+    """
+    Yields mark_safe() of every item of ``values``.
+    """
+    return _convert_stream(values, _safe_converters, _safe_converter)
+
+def mark_safe_many(values):
+    """
+    Returns a list with mark_safe() applied to every item of ``values``.
+    """
+    return list(mark_safe_stream(values))
+
+def mark_for_escaping_stream(values):
+    """
+    Yields mark_for_escaping() of every item of ``values``.
+    """
+    return _convert_stream(values, _escape_converters, _escape_converter)
+
+def mark_for_escaping_many(values):
+    """
+    Returns a list with mark_for_escaping() applied to every item of
+    ``values``.
+    """
+    return list(mark_for_escaping_stream(values))
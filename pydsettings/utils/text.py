@@ -1,20 +1,19 @@
 from __future__ import unicode_literals
 
+from functools import lru_cache, partial
+from io import BytesIO
 import re
 import unicodedata
-from gzip import GzipFile
-from io import BytesIO
 
-from pystorages.utils.encoding import force_text
-from pystorages.utils.functional import allow_lazy, SimpleLazyObject
-from pystorages.utils.safestring import mark_safe
+from pydsettings.utils.encoding import force_text
+from pydsettings.utils.functional import allow_lazy, SimpleLazyObject
+from pydsettings.utils.safestring import mark_safe
 import six
-from six.moves import html_entities
 
 if not six.PY3:
     # Import force_unicode even though this module doesn't use it, because some
     # people rely on it being here.
-    from pystorages.utils.encoding import force_unicode
+    from pydsettings.utils.encoding import force_unicode
 
 # Capitalizes the first letter of a string.
 capfirst = lambda x: x and force_text(x)[0].upper() + force_text(x)[1:]
@@ -24,6 +23,17 @@ capfirst = allow_lazy(capfirst, six.text_type)
 re_words = re.compile(r'&.*?;|<.*?>|(\w[\w-]*)', re.U|re.S)
 re_tag = re.compile(r'<(/)?([^ ]+?)(?:(\s*/)| .*?)?>', re.S)
 
+try:
+    _isascii = six.text_type.isascii
+except AttributeError:
+    # Python < 3.7
+    def _isascii(value):
+        try:
+            value.encode('ascii')
+        except UnicodeEncodeError:
+            return False
+        return True
+
 
 def wrap(text, width):
     """
@@ -51,6 +61,7 @@ def wrap(text, width):
                     pos = len(lines[-1])
             yield word
     return ''.join(_generator())
+_wrap = wrap
 wrap = allow_lazy(wrap, six.text_type)
 
 
@@ -62,19 +73,7 @@ class Truncator(SimpleLazyObject):
         super(Truncator, self).__init__(lambda: force_text(text))
 
     def add_truncation_text(self, text, truncate=None):
-        if truncate is None:
-            truncate = ('String to return when truncating text',
-                        '%(truncated_text)s...')
-        truncate = force_text(truncate)
-        if '%(truncated_text)s' in truncate:
-            return truncate % {'truncated_text': text}
-        # The truncation text didn't contain the %(truncated_text)s string
-        # replacement argument so just append it to the text.
-        if text.endswith(truncate):
-            # But don't append the truncation text if the current text already
-            # ends in this.
-            return text
-        return '%s%s' % (text, truncate)
+        return _add_truncation_text(text, _truncation_text(truncate))
 
     def chars(self, num, truncate=None):
         """
@@ -133,11 +132,7 @@ class Truncator(SimpleLazyObject):
 
         Newlines in the string will be stripped.
         """
-        words = self._wrapped.split()
-        if len(words) > length:
-            words = words[:length]
-            return self.add_truncation_text(' '.join(words), truncate)
-        return ' '.join(words)
+        return _text_words(self._wrapped, length, _truncation_text(truncate))
 
     def _html_words(self, length, truncate):
         """
@@ -147,64 +142,97 @@ class Truncator(SimpleLazyObject):
 
         Newlines in the HTML are preserved.
         """
-        if length <= 0:
-            return ''
-        html4_singlets = (
-            'br', 'col', 'link', 'base', 'img',
-            'param', 'area', 'hr', 'input'
-        )
-        # Count non-HTML words and keep note of open tags
-        pos = 0
-        end_text_pos = 0
-        words = 0
-        open_tags = []
-        while words <= length:
-            m = re_words.search(self._wrapped, pos)
-            if not m:
-                # Checked through whole string
-                break
-            pos = m.end(0)
-            if m.group(1):
-                # It's an actual non-HTML word
-                words += 1
-                if words == length:
-                    end_text_pos = pos
-                continue
-            # Check for tag
-            tag = re_tag.match(m.group(0))
-            if not tag or end_text_pos:
-                # Don't worry about non tags or tags after our truncate point
-                continue
-            closing_tag, tagname, self_closing = tag.groups()
-            # Element names are always case-insensitive
-            tagname = tagname.lower()
-            if self_closing or tagname in html4_singlets:
+        return _html_words(self._wrapped, length, _truncation_text(truncate))
+
+
+html4_singlets = (
+    'br', 'col', 'link', 'base', 'img',
+    'param', 'area', 'hr', 'input'
+)
+
+
+def _truncation_text(truncate):
+    if truncate is None:
+        truncate = ('String to return when truncating text',
+                    '%(truncated_text)s...')
+    return force_text(truncate)
+
+
+def _add_truncation_text(text, truncate):
+    if '%(truncated_text)s' in truncate:
+        return truncate % {'truncated_text': text}
+    # The truncation text didn't contain the %(truncated_text)s string
+    # replacement argument so just append it to the text.
+    if text.endswith(truncate):
+        # But don't append the truncation text if the current text already
+        # ends in this.
+        return text
+    return '%s%s' % (text, truncate)
+
+
+def _text_words(text, length, truncate):
+    words = text.split()
+    if len(words) > length:
+        words = words[:length]
+        return _add_truncation_text(' '.join(words), truncate)
+    return ' '.join(words)
+
+
+def _html_words(text, length, truncate):
+    if length <= 0:
+        return ''
+    # Count non-HTML words and keep note of open tags
+    pos = 0
+    end_text_pos = 0
+    words = 0
+    open_tags = []
+    while words <= length:
+        m = re_words.search(text, pos)
+        if not m:
+            # Checked through whole string
+            break
+        pos = m.end(0)
+        if m.group(1):
+            # It's an actual non-HTML word
+            words += 1
+            if words == length:
+                end_text_pos = pos
+            continue
+        # Check for tag
+        tag = re_tag.match(m.group(0))
+        if not tag or end_text_pos:
+            # Don't worry about non tags or tags after our truncate point
+            continue
+        closing_tag, tagname, self_closing = tag.groups()
+        # Element names are always case-insensitive
+        tagname = tagname.lower()
+        if self_closing or tagname in html4_singlets:
+            pass
+        elif closing_tag:
+            # Check for match in open tags list
+            try:
+                i = open_tags.index(tagname)
+            except ValueError:
                 pass
-            elif closing_tag:
-                # Check for match in open tags list
-                try:
-                    i = open_tags.index(tagname)
-                except ValueError:
-                    pass
-                else:
-                    # SGML: An end tag closes, back to the matching start tag,
-                    # all unclosed intervening start tags with omitted end tags
-                    open_tags = open_tags[i + 1:]
             else:
-                # Add it to the start of the open tags list
-                open_tags.insert(0, tagname)
-        if words <= length:
-            # Don't try to close tags if we don't need to truncate
-            return self._wrapped
-        out = self._wrapped[:end_text_pos]
-        truncate_text = self.add_truncation_text('', truncate)
-        if truncate_text:
-            out += truncate_text
-        # Close any tags still open
-        for tag in open_tags:
-            out += '</%s>' % tag
-        # Return string
-        return out
+                # SGML: An end tag closes, back to the matching start tag,
+                # all unclosed intervening start tags with omitted end tags
+                open_tags = open_tags[i + 1:]
+        else:
+            # Add it to the start of the open tags list
+            open_tags.insert(0, tagname)
+    if words <= length:
+        # Don't try to close tags if we don't need to truncate
+        return text
+    out = text[:end_text_pos]
+    truncate_text = _add_truncation_text('', truncate)
+    if truncate_text:
+        out += truncate_text
+    # Close any tags still open
+    for tag in open_tags:
+        out += '</%s>' % tag
+    # Return string
+    return out
 
 def get_valid_filename(s):
     """
@@ -252,19 +280,22 @@ def recapitalize(text):
     return text
 recapitalize = allow_lazy(recapitalize)
 
+char2number = {'a': '2', 'b': '2', 'c': '2', 'd': '3', 'e': '3', 'f': '3',
+     'g': '4', 'h': '4', 'i': '4', 'j': '5', 'k': '5', 'l': '5', 'm': '6',
+     'n': '6', 'o': '6', 'p': '7', 'q': '7', 'r': '7', 's': '7', 't': '8',
+     'u': '8', 'v': '8', 'w': '9', 'x': '9', 'y': '9', 'z': '9',
+    }
+_phone2numeric_table = dict((ord(c), n) for c, n in char2number.items())
+
 def phone2numeric(phone):
     "Converts a phone number with letters into its numeric equivalent."
-    char2number = {'a': '2', 'b': '2', 'c': '2', 'd': '3', 'e': '3', 'f': '3',
-         'g': '4', 'h': '4', 'i': '4', 'j': '5', 'k': '5', 'l': '5', 'm': '6',
-         'n': '6', 'o': '6', 'p': '7', 'q': '7', 'r': '7', 's': '7', 't': '8',
-         'u': '8', 'v': '8', 'w': '9', 'x': '9', 'y': '9', 'z': '9',
-        }
-    return ''.join(char2number.get(c, c) for c in phone.lower())
+    return phone.lower().translate(_phone2numeric_table)
 phone2numeric = allow_lazy(phone2numeric)
 
 # From http://www.xhaus.com/alan/python/httpcomp.html#gzip
 # Used with permission.
 def compress_string(s):
+    from gzip import GzipFile
     zbuf = BytesIO()
     zfile = GzipFile(mode='wb', compresslevel=6, fileobj=zbuf)
     zfile.write(s)
@@ -291,6 +322,7 @@ class StreamingBuffer(object):
 
 # Like compress_string, but for iterators of strings.
 def compress_sequence(sequence):
+    from gzip import GzipFile
     buf = StreamingBuffer()
     zfile = GzipFile(mode='wb', compresslevel=6, fileobj=buf)
     # Output headers...
@@ -302,27 +334,68 @@ def compress_sequence(sequence):
     zfile.close()
     yield buf.read()
 
-ustring_re = re.compile("([\u0080-\uffff])")
+class _JavascriptQuoteTable(dict):
+    """
+    A str.translate() table for javascript_quote(). Every character in the
+    ustring_re range is replaced with its \\uXXXX escape, computed the first
+    time it is seen and kept afterwards. ASCII characters are mapped up
+    front; characters past the BMP are left as they are without being
+    kept, so the table can't grow past 64K entries.
+    """
+    def __missing__(self, code):
+        if 0x80 <= code <= 0xffff:
+            value = self[code] = "\\u%04x" % code
+            return value
+        return code
+
+_javascript_quote_table = _JavascriptQuoteTable((code, code)
+                                               for code in range(0x80))
+_javascript_quote_table.update({
+    ord('\\'): '\\\\',
+    ord('\r'): '\\r',
+    ord('\n'): '\\n',
+    ord('\t'): '\\t',
+    ord("'"): "\\'",
+})
+_javascript_quote_double_table = _JavascriptQuoteTable(_javascript_quote_table)
+_javascript_quote_double_table[ord('"')] = '&quot;'
 
 def javascript_quote(s, quote_double_quotes=False):
-
-    def fix(match):
-        return "\\u%04x" % ord(match.group(1))
-
     if type(s) == bytes:
         s = s.decode('utf-8')
     elif type(s) != six.text_type:
         raise TypeError(s)
-    s = s.replace('\\', '\\\\')
-    s = s.replace('\r', '\\r')
-    s = s.replace('\n', '\\n')
-    s = s.replace('\t', '\\t')
-    s = s.replace("'", "\\'")
+    if _isascii(s):
+        # Nothing to \u-escape; a few str.replace() calls beat translate().
+        s = s.replace('\\', '\\\\')
+        s = s.replace('\r', '\\r')
+        s = s.replace('\n', '\\n')
+        s = s.replace('\t', '\\t')
+        s = s.replace("'", "\\'")
+        if quote_double_quotes:
+            s = s.replace('"', '&quot;')
+        return str(s)
     if quote_double_quotes:
-        s = s.replace('"', '&quot;')
-    return str(ustring_re.sub(fix, s))
+        return str(s.translate(_javascript_quote_double_table))
+    return str(s.translate(_javascript_quote_table))
+_javascript_quote = javascript_quote
 javascript_quote = allow_lazy(javascript_quote, six.text_type)
 
+def javascript_quote_many(values, quote_double_quotes=False):
+    """
+    Returns a list with javascript_quote() applied to every item of
+    ``values``.
+    """
+    return [_javascript_quote(value, quote_double_quotes) for value in values]
+
+def javascript_quote_stream(chunks, quote_double_quotes=False):
+    """
+    Yields javascript_quote() of every text chunk in ``chunks``. The quoting
+    is done character by character, so chunks can be split anywhere.
+    """
+    for chunk in chunks:
+        yield _javascript_quote(chunk, quote_double_quotes)
+
 # Expression to match some_token and some_token="with spaces" (and similarly
 # for single-quoted strings).
 smart_split_re = re.compile(r"""
@@ -335,6 +408,8 @@ smart_split_re = re.compile(r"""
     ) | \S+)
 """, re.VERBOSE)
 
+whitespace_re = re.compile(r'\s')
+
 def smart_split(text):
     r"""
     Generator that splits a string by spaces, leaving quoted phrases together.
@@ -354,7 +429,89 @@ def smart_split(text):
     for bit in smart_split_re.finditer(text):
         yield bit.group(0)
 
+# Matches a token in which every opened quote is also closed.
+closed_quotes_re = re.compile(r"""
+    (?:
+        [^'"]
+        | "(?:[^"\\]|\\.)*"
+        | '(?:[^'\\]|\\.)*'
+    )*
+    \Z
+""", re.VERBOSE | re.DOTALL)
+
+# Used by smart_split_stream() to skip over the text outside quotes and
+# inside quotes of either kind.
+_unquoted_re = re.compile(r"""[^\s'"]*""")
+_quoted_res = {
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL),
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*", re.DOTALL),
+}
+
+def _scan_quotes(text, pos, quote):
+    """
+    Scans ``text`` from ``pos``, inside the quote character ``quote`` (or
+    outside quotes if it's None), up to the first whitespace outside quotes.
+    Returns the position reached, the quote it's inside and whether it
+    stopped at whitespace. A trailing backslash is left unscanned, since
+    what it escapes isn't known yet.
+    """
+    end = len(text)
+    while pos < end:
+        if quote is None:
+            pos = _unquoted_re.match(text, pos).end()
+            if pos == end:
+                break
+            if text[pos] not in '\'"':
+                return pos, None, True
+            quote = text[pos]
+        else:
+            pos = _quoted_res[quote].match(text, pos).end()
+            if pos == end or text[pos] == '\\':
+                break
+            quote = None
+        pos += 1
+    return pos, quote, False
+
+def smart_split_stream(stream, chunk_size=64 * 1024):
+    r"""
+    Like smart_split(), but reads the text incrementally from ``stream``,
+    which is either a file-like object opened in text mode or an iterable of
+    text chunks. Tokens are yielded as soon as they are complete, so only the
+    token currently being read (e.g. a quoted phrase crossing chunk
+    boundaries) is kept in memory.
+
+    >>> list(smart_split_stream(['This is "a per', 'son\'s" test.']))
+    ['This', 'is', '"a person\'s"', 'test.']
+    """
+    if hasattr(stream, 'read'):
+        stream = iter(partial(stream.read, chunk_size), '')
+    buf = ''
+    # How far the held text has been scanned for quotes, and the quote that
+    # leaves it in, so that each chunk is only scanned once while a token is
+    # held, instead of splitting the whole buffer again.
+    scanned, quote = 0, None
+    for chunk in stream:
+        buf += force_text(chunk)
+        scanned, quote, boundary = _scan_quotes(buf, scanned, quote)
+        if not boundary:
+            continue
+        pos = len(buf)
+        for bit in smart_split_re.finditer(buf):
+            # A token not followed by whitespace may continue in the next
+            # chunk, and one with an unclosed quote may swallow everything up
+            # to the closing quote, so hold on to the rest of the buffer.
+            if (not whitespace_re.match(buf, bit.end()) or
+                    not closed_quotes_re.match(bit.group(0))):
+                pos = bit.start()
+                break
+            yield bit.group(0)
+        buf = buf[pos:]
+        scanned, quote, _ = _scan_quotes(buf, 0, None)
+    for bit in smart_split_re.finditer(buf):
+        yield bit.group(0)
+
 def _replace_entity(match):
+    from six.moves import html_entities
     text = match.group(1)
     if text[0] == '#':
         text = text[1:]
@@ -363,21 +520,84 @@ def _replace_entity(match):
                 c = int(text[1:], 16)
             else:
                 c = int(text)
-            return unichr(c)
-        except ValueError:
+            return six.unichr(c)
+        except (ValueError, OverflowError):
             return match.group(0)
     else:
         try:
-            return unichr(html_entities.name2codepoint[text])
+            return six.unichr(html_entities.name2codepoint[text])
         except (ValueError, KeyError):
             return match.group(0)
 
 _entity_re = re.compile(r"&(#?[xX]?(?:[0-9a-fA-F]+|\w{1,8}));")
+# Matches a trailing '&' that could still become an entity with more input.
+_entity_prefix_re = re.compile(r"&#?[xX]?\w*\Z")
+
+class _EntityCache(dict):
+    """
+    Maps the text of an entity (e.g. '&amp;') to its replacement. Named
+    entities are resolved up front; numeric ones are resolved on first use and
+    remembered, up to ``maxsize`` of them.
+    """
+    def __init__(self, entities, maxsize):
+        super(_EntityCache, self).__init__(entities)
+        self.limit = len(self) + maxsize
+
+    def __missing__(self, entity):
+        value = _replace_entity(_entity_re.match(entity))
+        if len(self) < self.limit:
+            self[entity] = value
+        return value
+
+# Built on first use by unescape_entities().
+_entity_cache = None
+
+def _resolve_entity(match):
+    return _entity_cache[match.group(0)]
 
 def unescape_entities(text):
-    return _entity_re.sub(_replace_entity, text)
+    global _entity_cache
+    if '&' not in text:
+        return text
+    if _entity_cache is None:
+        from six.moves import html_entities
+        _entity_cache = _EntityCache(
+            (('&%s;' % name, six.unichr(code))
+             for name, code in html_entities.name2codepoint.items()),
+            maxsize=4096)
+    return _entity_re.sub(_resolve_entity, text)
+_unescape_entities = unescape_entities
 unescape_entities = allow_lazy(unescape_entities, six.text_type)
 
+def unescape_entities_many(texts):
+    """
+    Returns a list with unescape_entities() applied to every item of
+    ``texts``.
+    """
+    return [_unescape_entities(text) for text in texts]
+
+def unescape_entities_stream(chunks):
+    """
+    Yields unescape_entities() of an iterable of text chunks, without
+    materializing the whole text. An entity split across chunks is held back
+    until it is complete.
+    """
+    buf = ''
+    for chunk in chunks:
+        buf += chunk
+        # Entities never contain '&', so only one starting at the last '&'
+        # can be incomplete.
+        amp = buf.rfind('&')
+        match = _entity_prefix_re.match(buf, amp) if amp != -1 else None
+        if match:
+            text, buf = buf[:match.start()], buf[match.start():]
+        else:
+            text, buf = buf, ''
+        if text:
+            yield _unescape_entities(text)
+    if buf:
+        yield _unescape_entities(buf)
+
 def unescape_string_literal(s):
     r"""
     Convert quoted string literals to unquoted strings with escaped quotes and
@@ -398,13 +618,112 @@ def unescape_string_literal(s):
     return s[1:-1].replace(r'\%s' % quote, quote).replace(r'\\', '\\')
 unescape_string_literal = allow_lazy(unescape_string_literal)
 
+slug_strip_re = re.compile(r'[^\w\s-]')
+slug_hyphenate_re = re.compile(r'[-\s]+')
+# After the ASCII folding below only ASCII bytes are left, so the stripping
+# can be done with bytes.translate() instead of slug_strip_re.
+_slug_strip_bytes = bytes(bytearray(i for i in range(128)
+                                    if slug_strip_re.match(six.unichr(i))))
+
 def slugify(value):
     """
     Converts to lowercase, removes non-word characters (alphanumerics and
     underscores) and converts spaces to hyphens. Also strips leading and
     trailing whitespace.
     """
-    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
-    value = re.sub('[^\w\s-]', '', value).strip().lower()
-    return mark_safe(re.sub('[-\s]+', '-', value))
+    if _isascii(value):
+        value = value.encode('ascii')
+    else:
+        value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore')
+    value = value.translate(None, _slug_strip_bytes).decode('ascii')
+    value = value.strip().lower()
+    return mark_safe(slug_hyphenate_re.sub('-', value))
+_slugify = slugify
 slugify = allow_lazy(slugify, six.text_type)
+
+_slugify_lru = lru_cache(maxsize=4096)(_slugify)
+
+def cached_slugify(value):
+    """
+    Like slugify(), but remembers the results for the 4096 most recently used
+    inputs. Useful when the same values (e.g. tag names) are slugified over
+    and over.
+    """
+    return _slugify_lru(force_text(value))
+cached_slugify.cache_info = _slugify_lru.cache_info
+cached_slugify.cache_clear = _slugify_lru.cache_clear
+
+#
+# Batch variants. These apply the functions above to every item of an
+# iterable, skipping the per-call lazy argument check of ``allow_lazy``. Lazy
+# items are forced to text up front. Passing ``processes`` fans the work out
+# across a ``multiprocessing.Pool`` of that size, which only pays off for very
+# large inputs.
+#
+
+def _map_many(func, values, processes, chunksize):
+    if not processes:
+        return [func(value) for value in values]
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(func, values, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+def _capfirst_one(value):
+    if not value:
+        return value
+    value = force_text(value)
+    return value[0].upper() + value[1:]
+
+def _wrap_one(text, width):
+    return _wrap(force_text(text), width)
+
+def _truncate_words_one(text, length, truncate, html):
+    text = force_text(text)
+    if html:
+        return _html_words(text, length, truncate)
+    return _text_words(text, length, truncate)
+
+def _slugify_one(value):
+    return _slugify(force_text(value))
+
+def capfirst_many(values, processes=None, chunksize=1000):
+    """
+    Returns a list with capfirst() applied to every item of ``values``.
+    """
+    return _map_many(_capfirst_one, values, processes, chunksize)
+
+def wrap_many(texts, width, processes=None, chunksize=1000):
+    """
+    Returns a list with wrap() applied to every item of ``texts``.
+    """
+    func = partial(_wrap_one, width=width)
+    return _map_many(func, texts, processes, chunksize)
+
+def truncate_many(texts, num, truncate=None, html=False, processes=None,
+                  chunksize=1000):
+    """
+    Returns a list with every item of ``texts`` truncated after ``num`` words,
+    like Truncator(text).words(num, truncate, html).
+    """
+    func = partial(_truncate_words_one, length=int(num),
+                   truncate=_truncation_text(truncate), html=html)
+    return _map_many(func, texts, processes, chunksize)
+
+def slugify_many(values, processes=None, chunksize=1000):
+    """
+    Returns a list with slugify() applied to every item of ``values``.
+    """
+    return _map_many(_slugify_one, values, processes, chunksize)
+
+def __getattr__(name):
+    # ustring_re isn't used by javascript_quote() anymore, and compiling it
+    # takes longer than importing the rest of this module, so it is only
+    # compiled on first access.
+    if name == 'ustring_re':
+        value = globals()[name] = re.compile("([\u0080-\uffff])")
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -1,9 +1,28 @@
+import asyncio
+import contextvars
+import importlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
 import unittest
 import warnings
 
-from pydsettings import signals
-from pydsettings.conf import settings
+from pydsettings import conf, signals
+from pydsettings.conf import LazySettings, settings
 from pydsettings.decorators import override_settings
+from pydsettings.daemon import SettingsClient, SettingsServer
+from pydsettings.exceptions import ImproperlyConfigured, ReceiverErrors
+from pydsettings.secrets import (FileSecretProvider, MemorySecretProvider,
+    SecretManager, secret)
+from pydsettings.shared import SharedSettings, SharedSettingsPublisher
+from pydsettings.tenants import TenantSettings
+from pydsettings.utils import encoding, module_loading, safestring, text
 import six
 
 settings.configure()
@@ -71,6 +90,83 @@ class ClassDecoratedTestCase(ClassDecoratedTestCaseSuper):
             self.fail()
 
 
+class ClassDecorationTests(unittest.TestCase):
+    def run_case(self, case):
+        enters = []
+
+        def receiver(sender, setting, enter, **kwargs):
+            if enter:
+                enters.append(setting)
+        signals.setting_changed.connect(receiver)
+        try:
+            suite = unittest.defaultTestLoader.loadTestsFromTestCase(case)
+            result = unittest.TestResult()
+            suite.run(result)
+        finally:
+            signals.setting_changed.disconnect(receiver)
+        self.assertEqual(result.errors + result.failures, [])
+        self.assertEqual(result.testsRun, 3)
+        return enters
+
+    def test_enabled_once_per_class(self):
+        @override_settings(TEST='override')
+        class Case(unittest.TestCase):
+            def test_a(self):
+                assert settings.TEST == 'override'
+
+            def test_b(self):
+                assert settings.TEST == 'override'
+
+            @override_settings(TEST='method')
+            def test_c(self):
+                assert settings.TEST == 'method'
+
+        self.assertEqual(self.run_case(Case), ['TEST', 'TEST'])
+        self.assertRaises(AttributeError, getattr, settings, 'TEST')
+
+    def test_inheritance(self):
+        @override_settings(TEST='base', TEST_BASE='base')
+        class Base(unittest.TestCase):
+            @classmethod
+            def setUpClass(cls):
+                super(Base, cls).setUpClass()
+                cls.seen = settings.TEST
+
+        @override_settings(TEST='sub')
+        class Sub(Base):
+            def test_a(self):
+                assert self.seen == 'sub'
+
+            def test_b(self):
+                assert settings.TEST_BASE == 'base'
+
+            def test_c(self):
+                assert settings.TEST == 'sub'
+
+        self.assertEqual(sorted(self.run_case(Sub)), ['TEST', 'TEST_BASE'])
+        self.assertRaises(AttributeError, getattr, settings, 'TEST')
+
+    def test_stacked(self):
+        @override_settings(TEST='outer', TEST_OUTER='outer')
+        @override_settings(TEST='inner', TEST_INNER='inner')
+        class Case(unittest.TestCase):
+            def test_a(self):
+                assert settings.TEST == 'outer'
+
+            def test_b(self):
+                assert settings.TEST_INNER == 'inner'
+
+            def test_c(self):
+                assert settings.TEST_OUTER == 'outer'
+
+        self.assertEqual(sorted(self.run_case(Case)),
+                         ['TEST', 'TEST_INNER', 'TEST_OUTER'])
+        self.assertRaises(AttributeError, getattr, settings, 'TEST')
+
+    def test_not_a_test_case(self):
+        self.assertRaises(TypeError, override_settings(TEST='x'), object)
+
+
 class SettingsTests(unittest.TestCase):
     def setUp(self):
         self.testvalue = None
@@ -176,3 +272,1104 @@ class SettingsTests(unittest.TestCase):
 
         self.assertRaises(AttributeError, getattr, settings, 'TEST')
         self.assertRaises(AttributeError, getattr, settings, 'TEST2')
+
+
+class TextTests(unittest.TestCase):
+    def test_slugify_many(self):
+        values = ['Hello World', ' Jack & Jill ', 'Un\xe9l\xe9phant']
+        self.assertEqual(text.slugify_many(values),
+                         [text.slugify(v) for v in values])
+
+    def test_wrap_many(self):
+        values = ['1234 67 9', 'short', 'a line\nbreak here']
+        self.assertEqual(text.wrap_many(values, 5),
+                         [text.wrap(v, 5) for v in values])
+
+    def test_truncate_many(self):
+        values = ['The quick brown fox', '<p>The <b>quick</b> brown fox</p>']
+        self.assertEqual(text.truncate_many(values, 2, truncate='...'),
+                         [text.Truncator(v).words(2, truncate='...')
+                          for v in values])
+        self.assertEqual(text.truncate_many(values, 2, '...', html=True),
+                         [text.Truncator(v).words(2, '...', html=True)
+                          for v in values])
+
+    def test_capfirst_many(self):
+        self.assertEqual(text.capfirst_many(['hello', '', b'bytes']),
+                         ['Hello', '', 'Bytes'])
+
+    def test_slugify(self):
+        self.assertEqual(text.slugify(' Jack & Jill like numbers 1,2,3 '),
+                         'jack-jill-like-numbers-123')
+        self.assertEqual(text.slugify('Un \xe9l\xe9phant \xe0 l\'or\xe9e'),
+                         'un-elephant-a-loree')
+
+    def test_cached_slugify(self):
+        text.cached_slugify.cache_clear()
+        self.assertEqual(text.cached_slugify('Hello World'), 'hello-world')
+        self.assertEqual(text.cached_slugify('Hello World'), 'hello-world')
+        self.assertEqual(text.cached_slugify.cache_info().hits, 1)
+
+    def test_phone2numeric(self):
+        self.assertEqual(text.phone2numeric('1-800-FLOWERS'), '1-800-3569377')
+
+    def test_smart_split_stream(self):
+        source = r'This is "a person\'s" test. And \'another one\' here'
+        chunks = [source[i:i + 3] for i in range(0, len(source), 3)]
+        self.assertEqual(list(text.smart_split_stream(chunks)),
+                         list(text.smart_split(source)))
+        self.assertEqual(
+            list(text.smart_split_stream(six.StringIO(source), chunk_size=4)),
+            list(text.smart_split(source)))
+        # A quoted phrase held across many chunks, with an escaped quote
+        # split from its backslash, and an unclosed quote at the end.
+        source = 'a "%s \\" b" c \'d e' % ' '.join(['word'] * 500)
+        chunks = [source[i:i + 7] for i in range(0, len(source), 7)]
+        self.assertEqual(list(text.smart_split_stream(chunks)),
+                         list(text.smart_split(source)))
+
+    def test_unescape_entities(self):
+        self.assertEqual(text.unescape_entities('&lt;b&gt; &#65;&#x42; &bogus;'),
+                         '<b> AB &bogus;')
+        self.assertEqual(
+            ''.join(text.unescape_entities_stream(['caf&ea', 'cute; &', '#6', '5;'])),
+            'caf\xe9 A')
+        self.assertEqual(text.unescape_entities_many(['&amp;', 'x']), ['&', 'x'])
+
+    def test_javascript_quote(self):
+        self.assertEqual(text.javascript_quote('a\'b"\n\\'), 'a\\\'b"\\n\\\\')
+        self.assertEqual(text.javascript_quote('"\xe9\u2603', True),
+                         '&quot;\\u00e9\\u2603')
+        self.assertEqual(text.javascript_quote_many(['\xe9', 'a']),
+                         ['\\u00e9', 'a'])
+        self.assertEqual(''.join(text.javascript_quote_stream(['\xe9\t', 'a'])),
+                         '\\u00e9\\ta')
+        size = len(text._javascript_quote_table)
+        self.assertEqual(text.javascript_quote('\xe9\U0001f600a'),
+                         '\\u00e9\U0001f600a')
+        self.assertNotIn(0x1f600, text._javascript_quote_table)
+        self.assertLessEqual(len(text._javascript_quote_table), size + 1)
+
+
+class EncodingTests(unittest.TestCase):
+    def test_force_text_many(self):
+        values = ['text', b'bytes', 1, None, [b'a', (b'b', {b'k': b'v'})]]
+        self.assertEqual(encoding.force_text_many(values),
+                         ['text', 'bytes', '1', 'None',
+                          ['a', ('b', {'k': 'v'})]])
+        self.assertEqual(encoding.force_text_many([1, None], strings_only=True),
+                         [1, None])
+        self.assertRaises(encoding.DjangoUnicodeDecodeError,
+                          encoding.force_text_many, [b'\xff'])
+        self.assertEqual(encoding.force_text_many({b'k': [b'v']}),
+                         {'k': ['v']})
+
+    def test_force_bytes_many(self):
+        values = ['text', b'bytes', 1, None, ['\xe9', {'k': 'v'}]]
+        self.assertEqual(encoding.force_bytes_many(values),
+                         [b'text', b'bytes', b'1', b'None',
+                          [b'\xc3\xa9', {b'k': b'v'}]])
+        self.assertEqual(encoding.force_bytes_many([b'\xc3\xa9'], 'latin-1'),
+                         [b'\xe9'])
+        self.assertEqual(encoding.force_bytes_many({'k': 'v'}), {b'k': b'v'})
+
+    def test_force_text_stream(self):
+        data = '\xe9t\xe9 \u2603'.encode('utf-8')
+        chunks = [data[i:i + 1] for i in range(len(data))]
+        self.assertEqual(''.join(encoding.force_text_stream(chunks)),
+                         '\xe9t\xe9 \u2603')
+        self.assertEqual(
+            ''.join(encoding.force_text_stream(six.BytesIO(data), chunk_size=3)),
+            '\xe9t\xe9 \u2603')
+        self.assertRaises(encoding.DjangoUnicodeDecodeError, list,
+                          encoding.force_text_stream([b'ok', data[:1]]))
+
+    def test_force_bytes_stream(self):
+        self.assertEqual(
+            b''.join(encoding.force_bytes_stream(['\xe9', 't\xe9'], 'utf-16')),
+            '\xe9t\xe9'.encode('utf-16'))
+        self.assertEqual(
+            b''.join(encoding.force_bytes_stream([b'\xc3', b'\xa9'], 'latin-1')),
+            b'\xe9')
+
+    def test_iri_to_uri(self):
+        self.assertEqual(encoding.iri_to_uri('/static/app.css?v=1#top'),
+                         '/static/app.css?v=1#top')
+        self.assertEqual(encoding.iri_to_uri('/m\xfcsic/ <x>'),
+                         '/m%C3%BCsic/%20%3Cx%3E')
+        self.assertEqual(encoding.cached_iri_to_uri('/a b'), '/a%20b')
+        self.assertEqual(encoding.iri_to_uri_many([1, True, 1.0, 1]),
+                         ['1', 'True', '1.0', '1'])
+        self.assertEqual(encoding.filepath_to_uri_many([b'a', 'a']), ['a', 'a'])
+        self.assertEqual([encoding.cached_iri_to_uri(v) for v in (1, True)],
+                         ['1', 'True'])
+        self.assertEqual(encoding.iri_to_uri_many([['x']]),
+                         [encoding.iri_to_uri(['x'])])
+        self.assertEqual(encoding.iri_to_uri_many(['/a b', '/c', '/a b', None]),
+                         ['/a%20b', '/c', '/a%20b', None])
+
+    def test_filepath_to_uri(self):
+        self.assertEqual(encoding.filepath_to_uri('upload\\test.png'),
+                         'upload/test.png')
+        self.assertEqual(encoding.filepath_to_uri('upload\\te st#.png'),
+                         'upload/te%20st%23.png')
+        self.assertEqual(encoding.filepath_to_uri_many(['a b', b'c\\d']),
+                         ['a%20b', 'c/d'])
+
+
+class ImportTimeTests(unittest.TestCase):
+    # Cumulative import time of the module, including everything it imports,
+    # in microseconds. Kept generous so that slow machines don't fail; the
+    # module checks below catch most regressions.
+    budget = 50000
+    deferred_modules = ('locale', 'decimal', 'multiprocessing', 'gzip',
+                        'html.entities', 'pysignals', 'threading',
+                        'concurrent.futures')
+
+    def import_times(self, module):
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+            stderr=subprocess.STDOUT, universal_newlines=True)
+        times = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+        return times
+
+    def assertImportCost(self, module):
+        times = self.import_times(module)
+        for name in self.deferred_modules:
+            self.assertNotIn(name, times,
+                             '%s imports %s' % (module, name))
+        self.assertLess(times[module], self.budget)
+
+    def test_conf(self):
+        self.assertImportCost('pydsettings.conf')
+
+    def test_utils(self):
+        self.assertImportCost('pydsettings.utils.text')
+
+
+class SafeStringTests(unittest.TestCase):
+    def test_safe_text(self):
+        s = safestring.SafeText('a')
+        self.assertIsInstance(s, safestring.SafeText)
+        self.assertIsInstance(s + safestring.SafeText('b'), safestring.SafeText)
+        self.assertNotIsInstance(s + 'b', safestring.SafeData)
+        self.assertIsInstance(s.encode('utf-8'), safestring.SafeBytes)
+        self.assertIsInstance(safestring.SafeBytes(b'a').decode('utf-8'),
+                              safestring.SafeText)
+
+    def test_safe_builder(self):
+        builder = safestring.SafeBuilder([safestring.mark_safe('<b>')])
+        builder.extend([safestring.mark_safe('x'), safestring.mark_safe('</b>')])
+        self.assertEqual(len(builder), 3)
+        result = builder.build()
+        self.assertEqual(result, '<b>x</b>')
+        self.assertIsInstance(result, safestring.SafeText)
+        builder.append('<i>')
+        self.assertNotIsInstance(builder.build(), safestring.SafeData)
+
+    def test_safe_join(self):
+        sep = safestring.mark_safe(', ')
+        result = safestring.safe_join(sep, [safestring.mark_safe('a'),
+                                            safestring.mark_safe('b')])
+        self.assertEqual(result, 'a, b')
+        self.assertIsInstance(result, safestring.SafeText)
+        self.assertNotIsInstance(safestring.safe_join(sep, ['a']),
+                                 safestring.SafeData)
+        self.assertNotIsInstance(
+            safestring.safe_join(', ', [safestring.mark_safe('a')]),
+            safestring.SafeData)
+
+    def test_mark_safe_many(self):
+        values = ['a', b'b', safestring.SafeText('c'), 1]
+        result = safestring.mark_safe_many(values)
+        self.assertEqual(result, ['a', b'b', 'c', '1'])
+        self.assertEqual([type(s) for s in result],
+                         [safestring.SafeText, safestring.SafeBytes,
+                          safestring.SafeText, safestring.SafeText])
+        self.assertEqual(list(safestring.mark_safe_stream(iter(['x']))), ['x'])
+
+    def test_mark_for_escaping_many(self):
+        safe = safestring.SafeText('s')
+        result = safestring.mark_for_escaping_many(['a', b'b', safe])
+        self.assertEqual([type(s) for s in result],
+                         [safestring.EscapeText, safestring.EscapeBytes,
+                          safestring.SafeText])
+        self.assertIs(result[2], safe)
+
+
+class ModuleLoadingTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.path, 'plugin_pkg'))
+        open(os.path.join(self.path, 'plugin_pkg', '__init__.py'), 'w').close()
+        sys.path.insert(0, self.path)
+        self.package = importlib.import_module('plugin_pkg')
+
+    def tearDown(self):
+        sys.path.remove(self.path)
+        sys.modules.pop('plugin_pkg', None)
+        shutil.rmtree(self.path)
+        importlib.invalidate_caches()
+
+    def test_module_has_submodule(self):
+        import pydsettings
+        self.assertTrue(module_loading.module_has_submodule(pydsettings, 'conf'))
+        self.assertFalse(module_loading.module_has_submodule(pydsettings, 'nope'))
+        self.assertFalse(module_loading.module_has_submodule(module_loading, 'x'))
+
+    def test_module_has_submodule_cache_invalidation(self):
+        self.assertFalse(module_loading.module_has_submodule(self.package, 'sub'))
+        open(os.path.join(self.path, 'plugin_pkg', 'sub.py'), 'w').close()
+        # The negative result is cached until the import caches are reset.
+        self.assertFalse(module_loading.module_has_submodule(self.package, 'sub'))
+        importlib.invalidate_caches()
+        self.assertTrue(module_loading.module_has_submodule(self.package, 'sub'))
+
+    def test_cache_invalidator_registered_once(self):
+        importlib.reload(module_loading)
+        importlib.reload(module_loading)
+        finders = [f for f in sys.meta_path
+                   if getattr(f, '__name__', None) == '_CacheInvalidator']
+        self.assertEqual(finders, [module_loading._CacheInvalidator])
+
+    def test_cached_import_by_path(self):
+        path = 'pydsettings.utils.module_loading.import_by_path'
+        self.assertIs(module_loading.cached_import_by_path(path),
+                      module_loading.import_by_path)
+        self.assertIn(path, module_loading._import_cache)
+
+    def test_resolve_settings_paths(self):
+        user_settings = LazySettings()
+        user_settings.configure(
+            HANDLERS=('json.JSONDecoder', 'collections.OrderedDict'),
+            SERIALIZER='json.dumps')
+        resolved = module_loading.resolve_settings_paths(
+            user_settings, ['HANDLERS', 'SERIALIZER'])
+        import collections
+        import json
+        self.assertEqual(resolved, {
+            'HANDLERS': (json.JSONDecoder, collections.OrderedDict),
+            'SERIALIZER': json.dumps,
+        })
+
+    def test_resolve_settings_paths_errors(self):
+        user_settings = LazySettings()
+        user_settings.configure(A=['json.missing', 'no_such_module.x'], B='b')
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            module_loading.resolve_settings_paths(user_settings, ['A', 'B'])
+        self.assertEqual(len(str(cm.exception).splitlines()), 3)
+
+    def test_resolve_settings_paths_generator(self):
+        user_settings = LazySettings()
+        user_settings.configure(A='json.dumps', B='collections.OrderedDict')
+        resolved = module_loading.resolve_settings_paths(
+            user_settings, (name for name in ['A', 'B']))
+        self.assertEqual(sorted(resolved), ['A', 'B'])
+
+    def test_resolve_paths_during_import(self):
+        # A module that reads the settings at import time sets them up, and
+        # so resolves their paths, while its own import lock is held.
+        with open(os.path.join(self.path, 'plugin_pkg', 'backends.py'), 'w') as f:
+            f.write('from plugin_pkg.conf import settings\n'
+                    'class Backend(object):\n'
+                    '    pass\n'
+                    'TIMEOUT = settings.TIMEOUT\n')
+        with open(os.path.join(self.path, 'plugin_pkg', 'conf.py'), 'w') as f:
+            f.write('from pydsettings.conf import LazySettings\n'
+                    'settings = LazySettings()\n'
+                    "settings.resolve_paths('BACKEND', 'SERIALIZER')\n")
+        with open(os.path.join(self.path, 'plugin_settings.py'), 'w') as f:
+            f.write("BACKEND = 'plugin_pkg.backends.Backend'\n"
+                    "SERIALIZER = 'json.dumps'\n"
+                    "TIMEOUT = 5\n")
+        old = os.environ.get(conf.ENVIRONMENT_VARIABLE)
+        os.environ[conf.ENVIRONMENT_VARIABLE] = 'plugin_settings'
+        try:
+            thread = threading.Thread(
+                target=importlib.import_module, args=('plugin_pkg.backends',))
+            thread.daemon = True
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive(), 'the import deadlocked')
+            self.assertEqual(sys.modules['plugin_pkg.backends'].TIMEOUT, 5)
+        finally:
+            if old is None:
+                del os.environ[conf.ENVIRONMENT_VARIABLE]
+            else:
+                os.environ[conf.ENVIRONMENT_VARIABLE] = old
+            for name in ('plugin_pkg.backends', 'plugin_pkg.conf',
+                         'plugin_settings'):
+                sys.modules.pop(name, None)
+
+    def test_resolve_paths_on_setup(self):
+        user_settings = LazySettings()
+        user_settings.resolve_paths('SERIALIZER')
+        self.assertRaises(ImproperlyConfigured, user_settings.configure,
+                          SERIALIZER='json.missing')
+
+    def test_warmup(self):
+        user_settings = LazySettings()
+        user_settings.resolve_paths('HANDLERS')
+        user_settings.configure(
+            HANDLERS=['json.decoder.JSONDecoder', 'collections.OrderedDict'],
+            # Not declared as a path, so not imported.
+            HOST='test.example.com',
+            BROKEN='os.missing')
+        report = user_settings.warmup()
+        self.assertEqual(
+            sorted(timing.path for timing in report),
+            ['collections.OrderedDict', 'json.decoder.JSONDecoder'])
+        self.assertEqual(report, sorted(report, key=lambda t: -t.seconds))
+        report = user_settings.warmup(['HANDLERS', 'BROKEN'])
+        errors = dict((timing.path, timing.error) for timing in report)
+        self.assertIsNone(errors['json.decoder.JSONDecoder'])
+        self.assertIsNotNone(errors['os.missing'])
+
+
+class InstrumentationTests(unittest.TestCase):
+    def setUp(self):
+        conf.settings_stats.reset()
+        conf.enable_instrumentation()
+
+    def tearDown(self):
+        conf.disable_instrumentation()
+        conf.settings_stats.reset()
+
+    def test_counts(self):
+        settings.TEST = 'test'
+        settings.TEST
+        with override_settings(TEST2='override'):
+            settings.TEST
+        del settings.TEST
+        stats = conf.settings_stats.as_dict()
+        self.assertEqual(stats['reads']['TEST'], 2)
+        self.assertEqual(stats['misses'], {})
+        self.assertEqual(stats['latency']['override_enter']['count'], 1)
+        self.assertEqual(stats['latency']['override_exit']['count'], 1)
+
+    def test_misses(self):
+        # Misses are reads that fall through to the global default settings.
+        defaults = types.ModuleType('defaults')
+        defaults.DEFAULT = defaults.TEST = 'default'
+        user_settings = LazySettings()
+        user_settings.configure(defaults, TEST='test')
+        with override_settings(A=1):
+            user_settings.TEST
+            user_settings.DEFAULT
+        user_settings.DEFAULT = 'set'
+        user_settings.DEFAULT
+        self.assertEqual(conf.settings_stats.as_dict()['misses'],
+                         {'DEFAULT': 1})
+
+    def test_module_misses(self):
+        module = types.ModuleType('stats_settings')
+        module.TEST = 'test'
+        defaults = types.ModuleType('defaults')
+        defaults.DEFAULT = defaults.TEST = 'default'
+        old, conf.global_settings = conf.global_settings, defaults
+        sys.modules['stats_settings'] = module
+        try:
+            user_settings = LazySettings()
+            user_settings._wrapped = conf.Settings('stats_settings')
+        finally:
+            conf.global_settings = old
+            del sys.modules['stats_settings']
+        user_settings.TEST
+        user_settings.DEFAULT
+        self.assertEqual(conf.settings_stats.as_dict()['misses'],
+                         {'DEFAULT': 1})
+
+    def test_concurrent_counts(self):
+        settings.TEST = 'test'
+        try:
+            def read():
+                for i in range(5000):
+                    settings.TEST
+            threads = [threading.Thread(target=read) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del settings.TEST
+        self.assertEqual(conf.settings_stats.reads['TEST'], 20000)
+
+    def test_prometheus(self):
+        settings.configured
+        self.assertRaises(AttributeError, getattr, settings, 'MISSING')
+        output = conf.settings_stats.as_prometheus()
+        self.assertIn('pydsettings_setting_reads_total{setting="MISSING"} 1\n',
+                      output)
+        self.assertIn('pydsettings_override_enter_seconds_count 0\n', output)
+
+    def test_disable(self):
+        conf.disable_instrumentation()
+        self.assertRaises(AttributeError, getattr, settings, 'MISSING')
+        self.assertEqual(conf.settings_stats.reads, {})
+
+
+class BulkAccessTests(unittest.TestCase):
+    def setUp(self):
+        self.settings = LazySettings()
+        self.settings.configure(CACHE_BACKEND='locmem', CACHE_TIMEOUT=300,
+                                DEBUG=False)
+
+    def test_get_many(self):
+        self.assertEqual(self.settings.get_many(['DEBUG', 'MISSING']),
+                         {'DEBUG': False})
+
+    def test_as_dict(self):
+        self.assertEqual(self.settings.as_dict(), {
+            'CACHE_BACKEND': 'locmem', 'CACHE_TIMEOUT': 300, 'DEBUG': False})
+
+    def test_namespace(self):
+        self.assertEqual(self.settings.namespace('CACHE_'),
+                         {'BACKEND': 'locmem', 'TIMEOUT': 300})
+        self.settings.CACHE_LOCATION = 'here'
+        del self.settings.CACHE_BACKEND
+        self.assertEqual(self.settings.namespace('CACHE_'),
+                         {'LOCATION': 'here', 'TIMEOUT': 300})
+
+    def test_namespace_overrides(self):
+        wrapped = self.settings._wrapped
+        override = conf.UserSettingsHolder(wrapped)
+        override.CACHE_TIMEOUT = 60
+        override.CACHE_KEY_PREFIX = 'p'
+        self.settings._wrapped = override
+        try:
+            self.assertEqual(self.settings.namespace('CACHE_'), {
+                'BACKEND': 'locmem', 'KEY_PREFIX': 'p', 'TIMEOUT': 60})
+            del override.CACHE_KEY_PREFIX
+            self.assertRaises(AttributeError, delattr, override,
+                              'CACHE_BACKEND')
+            self.assertEqual(self.settings.namespace('CACHE_'),
+                             {'TIMEOUT': 60})
+        finally:
+            self.settings._wrapped = wrapped
+
+    def test_module_settings(self):
+        module = type(sys)('bulk_settings')
+        module.CACHE_TIMEOUT = 300
+        module.CACHE_BACKEND = 'locmem'
+        module.lowercase = True
+        sys.modules['bulk_settings'] = module
+        try:
+            module_settings = conf.Settings('bulk_settings')
+        finally:
+            del sys.modules['bulk_settings']
+        self.assertEqual(module_settings._index,
+                         ['CACHE_BACKEND', 'CACHE_TIMEOUT', 'SETTINGS_MODULE'])
+        self.assertEqual(conf._setting_names(module_settings, 'CACHE_'),
+                         set(['CACHE_BACKEND', 'CACHE_TIMEOUT']))
+
+
+class TenantSettingsTests(unittest.TestCase):
+    def setUp(self):
+        self.base = LazySettings()
+        self.base.configure(DEBUG=False, TIME_ZONE='UTC')
+        self.store = {'a': {'TIME_ZONE': 'Europe/Madrid'}, 'b': {'DEBUG': True}}
+        self.loads = []
+        self.tenants = TenantSettings(self.load, self.base, max_tenants=2)
+
+    def load(self, tenants):
+        self.loads.append(tenants)
+        return dict((tenant, self.store[tenant])
+                    for tenant in tenants if tenant in self.store)
+
+    def test_overlay(self):
+        self.assertEqual(self.tenants['a'].TIME_ZONE, 'Europe/Madrid')
+        self.assertFalse(self.tenants['a'].DEBUG)
+        self.assertEqual(self.tenants['c'].TIME_ZONE, 'UTC')
+        self.assertEqual(self.tenants['a'].__dict__['TIME_ZONE'],
+                         'Europe/Madrid')
+        self.assertNotIn('DEBUG', self.tenants['a'].__dict__)
+
+    def test_bulk_load(self):
+        loaded = self.tenants.load(['a', 'b', 'a'])
+        self.assertTrue(loaded['b'].DEBUG)
+        self.tenants['a']
+        self.assertEqual(self.loads, [['a', 'b']])
+
+    def test_lru(self):
+        self.tenants['a']
+        self.tenants['b']
+        self.tenants['a']
+        self.tenants['c']
+        self.assertEqual(len(self.tenants), 2)
+        self.assertNotIn('b', self.tenants)
+        self.assertIn('a', self.tenants)
+        self.tenants.invalidate('a')
+        self.tenants['a']
+        self.assertEqual(self.loads, [['a'], ['b'], ['c'], ['a']])
+
+
+class DerivedSettingsTests(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.settings = LazySettings()
+        self.settings.configure(
+            HOST='localhost', PORT=5432, POOL_SIZE=4,
+            URL=conf.derived(self.url),
+            LABEL=conf.derived(lambda s: 'db at %s' % s.URL))
+
+    def url(self, s):
+        self.calls.append('URL')
+        return 'postgres://%s:%s/' % (s.HOST, s.PORT)
+
+    def test_cached(self):
+        self.assertEqual(self.settings.URL, 'postgres://localhost:5432/')
+        self.assertEqual(self.settings.URL, 'postgres://localhost:5432/')
+        self.assertEqual(self.calls, ['URL'])
+
+    def test_recomputed_on_change(self):
+        self.assertEqual(self.settings.LABEL, 'db at postgres://localhost:5432/')
+        self.settings.POOL_SIZE = 8
+        self.settings.LABEL
+        self.assertEqual(self.calls, ['URL'])
+        self.settings.PORT = 5433
+        self.assertEqual(self.settings.LABEL, 'db at postgres://localhost:5433/')
+        self.assertEqual(self.calls, ['URL', 'URL'])
+
+    def test_get_many(self):
+        self.assertEqual(self.settings.get_many(['URL', 'PORT']),
+                         {'URL': 'postgres://localhost:5432/', 'PORT': 5432})
+
+    def test_override_settings(self):
+        settings.DERIVED_HOST = 'localhost'
+        settings.DERIVED_URL = conf.derived(lambda s: 'http://%s/' % s.DERIVED_HOST)
+        try:
+            self.assertEqual(settings.DERIVED_URL, 'http://localhost/')
+            with override_settings(DERIVED_HOST='example.com'):
+                self.assertEqual(settings.DERIVED_URL, 'http://example.com/')
+            self.assertEqual(settings.DERIVED_URL, 'http://localhost/')
+        finally:
+            del settings.DERIVED_HOST
+            del settings.DERIVED_URL
+        self.assertRaises(AttributeError, getattr, settings, 'DERIVED_URL')
+
+    def test_receivers_read_current_value(self):
+        # Connected before the derived setting is first read.
+        seen = []
+
+        def receiver(setting, **kwargs):
+            if setting == 'DERIVED_HOST':
+                seen.append(settings.DERIVED_URL)
+        signals.setting_changed.connect(receiver)
+        settings.DERIVED_HOST = 'a'
+        settings.DERIVED_URL = conf.derived(lambda s: 'http://%s/' % s.DERIVED_HOST)
+        try:
+            self.assertEqual(settings.DERIVED_URL, 'http://a/')
+            with override_settings(DERIVED_HOST='b'):
+                pass
+        finally:
+            signals.setting_changed.disconnect(receiver)
+            del settings.DERIVED_HOST
+            del settings.DERIVED_URL
+        self.assertEqual(seen, ['http://b/', 'http://a/'])
+
+    def test_not_cached_if_changed_while_computed(self):
+        def url(s):
+            host = s.HOST
+            # As if another thread changed it meanwhile.
+            self.settings.HOST = 'example.com'
+            return 'http://%s/' % host
+        self.settings.URL = conf.derived(url)
+        self.assertEqual(self.settings.URL, 'http://localhost/')
+        self.assertNotIn('URL', self.settings._wrapped._derived_values)
+
+    def test_holder(self):
+        holder = conf.UserSettingsHolder(self.settings._wrapped)
+        holder.HOST = 'example.com'
+        self.assertEqual(holder.URL, 'postgres://example.com:5432/')
+        self.assertEqual(self.settings.URL, 'postgres://localhost:5432/')
+
+    def test_tenants(self):
+        tenants = TenantSettings(lambda ids: dict((t, {'HOST': t}) for t in ids),
+                                 base=self.settings)
+        self.assertEqual(tenants['a'].LABEL, 'db at postgres://a:5432/')
+        self.assertEqual(tenants['b'].URL, 'postgres://b:5432/')
+        self.assertEqual(self.settings.URL, 'postgres://localhost:5432/')
+        # Changing the base settings drops what the overlays cached.
+        self.settings.PORT = 5433
+        self.assertEqual(tenants['a'].LABEL, 'db at postgres://a:5433/')
+
+
+class FingerprintTests(unittest.TestCase):
+    def setUp(self):
+        self.settings = LazySettings()
+        self.settings.configure(DEBUG=False, HOSTS=['a', 'b'],
+                                CACHES={'default': {'TIMEOUT': 1}})
+
+    def test_stable(self):
+        fingerprint = self.settings.fingerprint()
+        self.assertEqual(len(fingerprint), 16)
+        other = LazySettings()
+        other.configure(CACHES={'default': {'TIMEOUT': 1}}, HOSTS=['a', 'b'],
+                        DEBUG=False)
+        self.assertEqual(other.fingerprint(), fingerprint)
+
+    def test_updated(self):
+        fingerprint = self.settings.fingerprint()
+        self.settings.DEBUG = True
+        self.assertNotEqual(self.settings.fingerprint(), fingerprint)
+        self.settings.DEBUG = False
+        self.assertEqual(self.settings.fingerprint(), fingerprint)
+        del self.settings.HOSTS
+        self.assertNotEqual(self.settings.fingerprint(), fingerprint)
+
+    def test_overrides(self):
+        wrapped = self.settings._wrapped
+        fingerprint = self.settings.fingerprint()
+        override = conf.UserSettingsHolder(wrapped)
+        override.DEBUG = True
+        self.assertNotEqual(override.fingerprint(), fingerprint)
+        override.DEBUG = False
+        self.assertEqual(override.fingerprint(), fingerprint)
+        wrapped.HOSTS = []
+        self.assertEqual(override.fingerprint(), self.settings.fingerprint())
+        self.assertRaises(AttributeError, delattr, override, 'HOSTS')
+        self.assertEqual(override.fingerprint(['HOSTS', 'MISSING']),
+                         '0' * 16)
+
+    def test_subset(self):
+        fingerprint = self.settings.fingerprint(['DEBUG'])
+        self.settings.HOSTS = []
+        self.assertEqual(self.settings.fingerprint(['DEBUG']), fingerprint)
+
+    def test_unordered_values(self):
+        self.settings.SET = set(['x', 'y', 'z'])
+        fingerprint = self.settings.fingerprint()
+        self.settings.SET = set(['z', 'y', 'x'])
+        self.assertEqual(self.settings.fingerprint(), fingerprint)
+
+    def test_derived(self):
+        def configured():
+            lazy_settings = LazySettings()
+            lazy_settings.configure(
+                HOST='a', URL=conf.derived(lambda s: 'http://%s/' % s.HOST))
+            return lazy_settings
+        self.assertEqual(configured().fingerprint(), configured().fingerprint())
+
+    def test_derived_on_one_line(self):
+        a, b = conf.derived(lambda s: s.A), conf.derived(lambda s: s.B)
+        self.assertNotEqual(conf._canonical(a), conf._canonical(b))
+
+
+class SharedSettingsTests(unittest.TestCase):
+    def setUp(self):
+        self.publisher = SharedSettingsPublisher(size=4096)
+        self.publisher.publish({'DEBUG': False, 'HOSTS': ['a']})
+        self.shared = SharedSettings(self.publisher.name)
+
+    def tearDown(self):
+        self.shared.close()
+        self.publisher.close()
+
+    def test_read(self):
+        user_settings = LazySettings()
+        user_settings.configure(default_settings=self.shared, LOCAL=True)
+        self.assertEqual(user_settings.as_dict(),
+                         {'DEBUG': False, 'HOSTS': ['a'], 'LOCAL': True})
+        fingerprint = user_settings.fingerprint()
+        self.publisher.publish({'DEBUG': True, 'HOSTS': ['a']})
+        self.assertTrue(user_settings.DEBUG)
+        self.assertNotEqual(user_settings.fingerprint(), fingerprint)
+        self.assertRaises(AttributeError, getattr, user_settings, 'MISSING')
+
+    def test_decoded_once(self):
+        self.shared.DEBUG
+        values = self.shared._values
+        self.shared.HOSTS
+        self.assertIs(self.shared._values, values)
+        self.assertEqual(self.shared.version, self.publisher.version)
+
+    def test_other_process(self):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'from pydsettings.shared import SharedSettings; '
+            'print(SharedSettings(%r).HOSTS)' % self.publisher.name])
+        self.assertEqual(output.strip(), b"['a']")
+
+    def test_too_large(self):
+        self.assertRaises(ValueError, self.publisher.publish, {'X': 'x' * 5000})
+        self.assertFalse(self.shared.DEBUG)
+
+    def test_json(self):
+        self.assertRaises(TypeError, self.publisher.publish, {'X': object()})
+        self.assertFalse(self.shared.DEBUG)
+        self.publisher.publish({'HOSTS': ('a', 'b')})
+        self.assertEqual(self.shared.HOSTS, ['a', 'b'])
+
+
+class SettingsDaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'settings.sock')
+        self.server = SettingsServer(self.path, {'DEBUG': False, 'PORT': 80})
+        self.server.start()
+        self.changes = []
+        signals.setting_changed.connect(self.receiver)
+
+    def tearDown(self):
+        signals.setting_changed.disconnect(self.receiver)
+        if os.path.exists(self.path):
+            self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def receiver(self, sender, setting, value, **kwargs):
+        if sender is SettingsClient:
+            self.changes.append((setting, value))
+
+    def wait_for(self, condition):
+        for i in range(200):
+            if condition():
+                return
+            time.sleep(0.01)
+        self.fail("Timed out.")
+
+    def test_stalled_client(self):
+        self.server.send_timeout = 0.2
+        stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stalled.connect(self.path)
+        self.wait_for(lambda: len(self.server._clients) == 1)
+        client = SettingsClient(self.path).start()
+        try:
+            value = 'x' * 100000
+            start = time.time()
+            for i in range(50):
+                self.server.update({'VALUE': value + str(i)})
+            # Neither update() nor the other clients wait for the stalled one.
+            self.assertLess(time.time() - start, 0.5)
+            self.wait_for(lambda: client.VALUE == value + '49')
+            self.wait_for(lambda: len(self.server._clients) == 1)
+        finally:
+            client.close()
+            stalled.close()
+
+    def test_unexpected_error_logged(self):
+        client = SettingsClient(self.path)
+        receive = client._receive
+        calls = []
+
+        def failing_receive(message):
+            calls.append(message)
+            if len(calls) == 1:
+                raise RuntimeError('bug')
+            receive(message)
+        client.__dict__['_receive'] = failing_receive
+        with self.assertLogs('pydsettings.daemon', 'ERROR') as cm:
+            client.start()
+        try:
+            self.assertIn('RuntimeError: bug', cm.output[0])
+            self.assertEqual(client.PORT, 80)
+        finally:
+            client.close()
+
+    def test_push(self):
+        client = SettingsClient(self.path).start()
+        try:
+            user_settings = LazySettings()
+            user_settings.configure(default_settings=client)
+            self.assertEqual(user_settings.PORT, 80)
+            del self.changes[:]
+            self.server.update({'PORT': 8080, 'DEBUG': False}, deleted=['X'])
+            self.wait_for(lambda: client.version == 1)
+            self.assertEqual(user_settings.PORT, 8080)
+            self.assertEqual(self.changes, [('PORT', 8080)])
+        finally:
+            client.close()
+
+    def test_failing_receiver(self):
+        def receiver(**kwargs):
+            raise RuntimeError('receiver failed')
+        signals.setting_changed.connect(receiver)
+        client = SettingsClient(self.path).start()
+        try:
+            self.server.update({'PORT': 3})
+            self.wait_for(lambda: client.version == 1)
+            self.assertEqual(client.PORT, 3)
+            self.server.update({'PORT': 4})
+            self.wait_for(lambda: client.version == 2)
+        finally:
+            signals.setting_changed.disconnect(receiver)
+            client.close()
+        self.assertEqual(self.changes[-2:], [('PORT', 3), ('PORT', 4)])
+
+    def test_close_unstarted(self):
+        SettingsClient(self.path).close()
+
+    def test_reconnect_and_cache(self):
+        cache_path = os.path.join(self.tmpdir, 'cache.json')
+        client = SettingsClient(self.path, cache_path, max_backoff=0.05)
+        client.start()
+        try:
+            self.server.stop()
+            self.wait_for(lambda: not client.connected)
+            self.assertEqual(client.PORT, 80)
+            self.server = SettingsServer(self.path, {'PORT': 81}).start()
+            self.wait_for(lambda: client.connected and client.PORT == 81)
+            self.assertRaises(AttributeError, getattr, client, 'DEBUG')
+        finally:
+            client.close()
+        self.server.stop()
+        cached = SettingsClient(self.path, cache_path).start(timeout=0.1)
+        cached.close()
+        self.assertEqual(cached.PORT, 81)
+        self.assertRaises(ImproperlyConfigured,
+                          SettingsClient(self.path).start, 0.1)
+
+
+class SecretTests(unittest.TestCase):
+    def setUp(self):
+        self.provider = MemorySecretProvider('s3cret', ttl=0.05)
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'token')
+        with open(path, 'w') as f:
+            f.write('token\n')
+        self.settings = LazySettings()
+        self.settings.configure(
+            PASSWORD=secret(self.provider),
+            TOKEN=secret(FileSecretProvider(path)),
+            DSN=conf.derived(lambda s: 'db:%s' % s.PASSWORD))
+        self.changes = []
+        signals.setting_changed.connect(self.receiver)
+
+    def tearDown(self):
+        signals.setting_changed.disconnect(self.receiver)
+        shutil.rmtree(self.tmpdir)
+
+    def receiver(self, sender, setting, value, **kwargs):
+        if sender is SecretManager:
+            self.changes.append((setting, value))
+
+    def run_manager(self, coroutine):
+        async def run():
+            manager = SecretManager(self.settings, retry_interval=0.01)
+            await manager.start()
+            try:
+                await coroutine(manager)
+            finally:
+                await manager.stop()
+        asyncio.run(run())
+
+    def test_not_fetched(self):
+        self.assertRaises(ImproperlyConfigured, getattr, self.settings,
+                          'PASSWORD')
+
+    def test_rotation(self):
+        async def check(manager):
+            self.assertEqual(self.settings.TOKEN, 'token')
+            self.assertEqual(self.settings.DSN, 'db:s3cret')
+            fingerprint = self.settings.fingerprint()
+            self.provider.set('rotated')
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.settings.DSN, 'db:rotated')
+            self.assertNotEqual(self.settings.fingerprint(), fingerprint)
+            # Fingerprints don't hash the secret itself.
+            self.assertNotIn('rotated', conf._canonical(secret(self.provider)))
+        self.run_manager(check)
+        self.assertEqual(sorted(self.changes), [
+            ('PASSWORD', 'rotated'), ('PASSWORD', 's3cret'),
+            ('TOKEN', 'token')])
+
+    def test_failing_receiver(self):
+        seen = []
+
+        def receiver(setting, **kwargs):
+            if setting == 'PASSWORD':
+                seen.append(self.settings.DSN)
+                raise RuntimeError('receiver failed')
+        signals.setting_changed.connect(receiver)
+
+        async def check(manager):
+            self.provider.set('v2')
+            await asyncio.sleep(0.1)
+            self.provider.set('v3')
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.settings.PASSWORD, 'v3')
+            self.assertFalse(manager._task.done())
+        try:
+            self.run_manager(check)
+        finally:
+            signals.setting_changed.disconnect(receiver)
+        self.assertEqual(seen[-2:], ['db:v2', 'db:v3'])
+
+    def test_stop_after_error(self):
+        async def fail():
+            raise RuntimeError('refresh failed')
+
+        async def run():
+            manager = SecretManager(self.settings)
+            manager._task = asyncio.ensure_future(fail())
+            await asyncio.sleep(0)
+            await manager.stop()
+        asyncio.run(run())
+
+    def test_stale_while_failing(self):
+        async def check(manager):
+            self.provider.error = IOError('unavailable')
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.settings.PASSWORD, 's3cret')
+            self.provider.error = None
+            self.provider.set('recovered')
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.settings.PASSWORD, 'recovered')
+        self.run_manager(check)
+
+    def test_start_errors(self):
+        self.provider.error = IOError('unavailable')
+        with self.assertRaises(ImproperlyConfigured) as cm:
+            self.run_manager(None)
+        self.assertIn('PASSWORD: unavailable', str(cm.exception))
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.settings = LazySettings()
+        self.settings.configure(A=1, B=2)
+
+    def test_restore(self):
+        token = self.settings.snapshot()
+        self.settings.A = 10
+        del self.settings.B
+        self.settings.C = 3
+        self.assertEqual(self.settings.as_dict(), {'A': 10, 'C': 3})
+        self.settings.restore(token)
+        self.assertEqual(self.settings.as_dict(), {'A': 1, 'B': 2})
+        self.settings.A = 20
+        self.settings.restore(token)
+        self.assertEqual(self.settings.A, 1)
+
+    def test_many_snapshots(self):
+        tokens = []
+        for i in range(100):
+            self.settings.A = i
+            tokens.append(self.settings.snapshot())
+        depth = 0
+        holder = self.settings._wrapped
+        while isinstance(holder, conf._SnapshotLayer):
+            depth += 1
+            holder = holder.default_settings
+        self.assertLessEqual(depth, self.settings.max_snapshot_depth + 1)
+        for i in (0, 42, 99):
+            self.settings.restore(tokens[i])
+            self.assertEqual(self.settings.as_dict(), {'A': i, 'B': 2})
+
+    def test_unchanged_snapshots_share(self):
+        token = self.settings.snapshot()
+        wrapped = self.settings._wrapped
+        self.assertIs(self.settings.snapshot()._settings, token._settings)
+        self.assertIs(self.settings._wrapped, wrapped)
+
+    def test_derived_cleared(self):
+        self.settings.C = conf.derived(lambda s: s.A * 2)
+        token = self.settings.snapshot()
+        self.assertEqual(self.settings.C, 2)
+        self.settings.restore(token)
+        self.settings.A = 5
+        self.assertEqual(self.settings.C, 10)
+        self.assertRaises(TypeError, self.settings.restore, object())
+
+    def test_snapshot_inside_override(self):
+        start = settings.snapshot()
+        settings.TEST = 1
+        try:
+            with override_settings(TEST_OUTER=2):
+                token = settings.snapshot()
+            settings.TEST = 99
+            settings.restore(token)
+            self.assertEqual(settings.TEST, 1)
+            self.assertEqual(settings.TEST_OUTER, 2)
+        finally:
+            settings.restore(start)
+        self.assertRaises(AttributeError, getattr, settings, 'TEST')
+
+
+class ConcurrentDispatchTests(unittest.TestCase):
+    def setUp(self):
+        self.receivers = []
+        signals.enable_concurrent_dispatch(max_workers=4)
+
+    def tearDown(self):
+        signals.disable_concurrent_dispatch()
+        for receiver in self.receivers:
+            signals.setting_changed.disconnect(receiver)
+
+    def connect(self, receiver):
+        self.receivers.append(receiver)
+        signals.setting_changed.connect(receiver)
+
+    def test_concurrent(self):
+        threads = set()
+
+        def slow(sender, **kwargs):
+            threads.add(threading.current_thread())
+            time.sleep(0.05)
+        for i in range(4):
+            self.connect(lambda slow=slow, **kwargs: slow(**kwargs))
+        start = time.time()
+        with override_settings(TEST='override'):
+            pass
+        self.assertLess(time.time() - start, 0.3)
+        self.assertGreater(len(threads), 1)
+
+    def test_errors(self):
+        def fail(sender, setting, **kwargs):
+            raise ValueError(setting)
+
+        def fail_too(sender, setting, **kwargs):
+            raise KeyError(setting)
+        calls = []
+        self.connect(fail)
+        self.connect(lambda sender, **kwargs: calls.append(sender))
+        self.connect(fail_too)
+        with self.assertRaises(ReceiverErrors) as cm:
+            signals.setting_changed.send(sender=None, setting='TEST',
+                                         value=1, enter=True)
+        self.assertEqual(len(cm.exception.errors), 2)
+        self.assertEqual(calls, [None])
+        responses = signals.setting_changed.send_robust(
+            sender=None, setting='TEST', value=1, enter=True)
+        self.assertEqual(len([receiver for receiver, response in responses
+                              if receiver in self.receivers]), 3)
+
+    def test_nested_send(self):
+        calls = []
+
+        def outer(sender, setting, **kwargs):
+            if setting == 'OUTER':
+                signals.setting_changed.send(sender=None, setting='INNER',
+                                             value=1, enter=True)
+        self.connect(outer)
+        self.connect(lambda sender, setting, **kwargs: calls.append(setting))
+        signals.setting_changed.send(sender=None, setting='OUTER', value=1,
+                                     enter=True)
+        self.assertEqual(sorted(calls), ['INNER', 'OUTER'])
+
+    def test_context_variables(self):
+        var = contextvars.ContextVar('var')
+        seen = []
+        for i in range(3):
+            self.connect(lambda sender, **kwargs: seen.append(var.get(None)))
+        token = var.set('value')
+        try:
+            signals.setting_changed.send(sender=None, setting='TEST',
+                                         value=1, enter=True)
+        finally:
+            var.reset(token)
+        self.assertEqual(seen, ['value'] * 3)
+
+    def test_pool_shut_down_while_sending(self):
+        calls = []
+        for i in range(3):
+            self.connect(lambda sender, **kwargs: calls.append(sender))
+        # As if disable_concurrent_dispatch() ran in another thread.
+        signals.setting_changed.executor.shutdown()
+        signals.setting_changed.send(sender=None, setting='TEST', value=1,
+                                     enter=True)
+        self.assertEqual(calls, [None] * 3)